@@ -0,0 +1,161 @@
+"""
+Benchmarks for the language_check service.
+
+    python benchmark.py responses              # serialization: jsonable_encoder + json vs orjson
+    python benchmark.py http --url http://localhost:8080/language_check
+    python benchmark.py packs --sizes 5 20 75   # per-request cost vs registered languages
+
+Only `packs` imports main, and so builds the detectors and loads the models.
+For end-to-end before/after numbers, run `http` against a server started from
+each revision.
+"""
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from lingua import Language, LanguageDetectorBuilder
+
+from check_result import CheckResult
+from language_packs import LanguagePack, PackRegistry, normalize_and_tokenize
+
+SAMPLE_BOT_ID = "delhi_friend_male"
+SAMPLE_LANGUAGES = ["hindi", "english"]
+SAMPLE_MESSAGE = "Yaar, talk to me in Hindi or English! Other languages go over my head."
+SAMPLE_INPUTS = [
+    "kya haal hai bhai",
+    "I am going to the market later today",
+    "Bonjour, comment ça va ?",
+    "नमस्ते आप कैसे हैं",
+]
+
+
+def _check_result(user_input: str) -> CheckResult:
+    check = CheckResult(SAMPLE_BOT_ID, user_input)
+    check.used.append("hinglish_model")
+    check.detected_language = "hin"
+    check.supported_languages = SAMPLE_LANGUAGES
+    return check.reject("rejected: hinglish_model", SAMPLE_MESSAGE)
+
+
+def _time(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(SAMPLE_INPUTS[i % len(SAMPLE_INPUTS)])
+    return iterations / (time.perf_counter() - start)
+
+
+def bench_responses(iterations: int) -> None:
+    # The same body through each serializer; the first is what FastAPI does for a returned dict.
+    cases = {
+        "jsonable_encoder + json (debug_info)": lambda text: json.dumps(
+            jsonable_encoder(_check_result(text).to_dict(True))
+        ).encode("utf-8"),
+        "orjson (debug_info)": lambda text: orjson.dumps(_check_result(text).to_dict(True)),
+        "orjson (no debug_info)": lambda text: orjson.dumps(_check_result(text).to_dict(False)),
+    }
+    for name, fn in cases.items():
+        print(f"{name:<40} {_time(fn, iterations):>12,.0f} responses/s")
+
+
+def bench_http(url: str, requests: int, concurrency: int, debug: bool) -> None:
+    target = f"{url}?debug={'true' if debug else 'false'}"
+
+    def send(i: int) -> None:
+        body = orjson.dumps({"bot_id": SAMPLE_BOT_ID, "user_input": SAMPLE_INPUTS[i % len(SAMPLE_INPUTS)]})
+        request = urllib.request.Request(target, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request) as response:
+            response.read()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, range(requests)))
+    elapsed = time.perf_counter() - start
+    print(f"{target}: {requests / elapsed:,.1f} requests/s ({requests} requests, concurrency {concurrency})")
+
+
+PACK_BOT_LANGUAGES = ["french", "english"]
+PACK_INPUTS = [
+    "merci beaucoup ami",
+    "danke schön freund",
+    "Je voudrais réserver une table pour deux personnes ce soir",
+    "Can you recommend a good book for the weekend?",
+]
+
+
+def _registry_with(size: int) -> tuple[PackRegistry, dict]:
+    """The real packs plus synthetic ones for other lingua languages, up to size languages."""
+    from main import ALL_SUPPORTED_LANGUAGES, LANGUAGE_PACKS
+
+    registry = PackRegistry(ALL_SUPPORTED_LANGUAGES)
+    for pack in LANGUAGE_PACKS:
+        registry.register(LanguagePack(pack.name, pack.lingua, pack.keywords))
+    extra = sorted((lang for lang in Language.all() if lang not in ALL_SUPPORTED_LANGUAGES), key=lambda lang: lang.name)
+    for lang in extra[:max(0, size - len(registry))]:
+        name = lang.name.lower()
+        registry.register(LanguagePack(name, lang, [f"{name}{i}" for i in range(150)]))
+    keyword_map = {pack.name: pack.keywords for pack in registry}
+    return registry, keyword_map
+
+
+def bench_packs(sizes: list[int], iterations: int) -> None:
+    for size in sizes:
+        registry, keyword_map = _registry_with(size)
+        # Before language packs: one detector over every language, linear keyword scan.
+        legacy_detector = LanguageDetectorBuilder.from_languages(*(pack.lingua for pack in registry)).build()
+
+        def legacy(text: str) -> None:
+            tokens = normalize_and_tokenize(text)
+            for lang in keyword_map:
+                for word in keyword_map[lang]:
+                    if word in tokens:
+                        return
+            legacy_detector.detect_language_of(text)
+
+        def packs(text: str) -> None:
+            if registry.match_keyword(normalize_and_tokenize(text), PACK_BOT_LANGUAGES):
+                return
+            registry.detector(PACK_BOT_LANGUAGES).detect_language_of(text)
+
+        results = {}
+        for name, fn in (("legacy", legacy), ("packs", packs)):
+            for text in PACK_INPUTS:  # warm up lazily loaded lingua models
+                fn(text)
+            start = time.perf_counter()
+            for i in range(iterations):
+                fn(PACK_INPUTS[i % len(PACK_INPUTS)])
+            results[name] = 1e6 * (time.perf_counter() - start) / iterations
+        print(f"{len(registry):>3} languages: legacy {results['legacy']:>9.1f} us/request   packs {results['packs']:>9.1f} us/request")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    responses = sub.add_parser("responses", help="in-process response serialization throughput")
+    responses.add_argument("--iterations", type=int, default=200_000)
+
+    http = sub.add_parser("http", help="end-to-end requests/s against a running server")
+    http.add_argument("--url", default="http://localhost:8080/language_check")
+    http.add_argument("--requests", type=int, default=2_000)
+    http.add_argument("--concurrency", type=int, default=16)
+
+    packs = sub.add_parser("packs", help="per-request keyword + lingua cost as language packs are added")
+    packs.add_argument("--sizes", type=int, nargs="+", default=[5, 20, 75])
+    packs.add_argument("--iterations", type=int, default=2_000)
+
+    args = parser.parse_args()
+    if args.command == "responses":
+        bench_responses(args.iterations)
+    elif args.command == "http":
+        for debug in (True, False):
+            bench_http(args.url, args.requests, args.concurrency, debug)
+    elif args.command == "packs":
+        bench_packs(args.sizes, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
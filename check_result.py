@@ -0,0 +1,62 @@
+"""
+Response model for /language_check and /ws/language_check.
+
+Has no dependency on the service's models or detectors, so benchmark.py can
+import it without loading them.
+"""
+
+
+class CheckResult:
+    """
+    Outcome of one language check.
+    Uses __slots__ and only builds the debug_info dict when the caller asks for it.
+    """
+    __slots__ = (
+        "bot_id", "user_input", "used", "result", "detected_language",
+        "supported_languages", "supported", "message", "analysis", "cacheable",
+    )
+
+    def __init__(self, bot_id: str, user_input: str):
+        self.bot_id = bot_id
+        self.user_input = user_input
+        self.used = []
+        self.result = None
+        self.detected_language = None
+        self.supported_languages = None
+        self.supported = True
+        self.message = None
+        self.analysis = None
+        # Cleared when a stage failed, so a degraded verdict is not cached or persisted.
+        self.cacheable = True
+
+    def accept(self, result: str) -> "CheckResult":
+        self.supported = True
+        self.result = result
+        return self
+
+    def reject(self, result: str | None, message: str) -> "CheckResult":
+        self.supported = False
+        self.result = result
+        self.message = message
+        return self
+
+    def debug_info(self) -> dict:
+        info = {
+            "bot_id": self.bot_id,
+            "input": self.user_input,
+            "used": self.used,
+            "result": self.result,
+            "detected_language": self.detected_language,
+        }
+        if self.supported_languages is not None:
+            info["supported_languages"] = self.supported_languages
+        return info
+
+    def to_dict(self, include_debug: bool = True) -> dict:
+        if self.supported:
+            body = {"supported": True}
+        else:
+            body = {"supported": False, "message": self.message}
+        if include_debug:
+            body["debug_info"] = self.debug_info()
+        return body
@@ -0,0 +1,344 @@
+"""
+Offline accuracy-vs-latency evaluation of the language_check cascade.
+
+Runs a labelled corpus (JSONL or CSV with text, bot_id, supported, and an
+optional language) through run_language_check under one or more configurations
+and appends one JSON record per configuration to a results file, so runs can be
+compared later.
+
+    python evaluate.py run eval/sample_corpus.jsonl --configs eval/configs.json
+    python evaluate.py prefilter eval/latin_tune.jsonl --margins 0.5 0.6 0.75 1.0
+    python evaluate.py prefilter eval/latin_heldout.jsonl
+    python evaluate.py compare eval_results.jsonl
+"""
+import argparse
+import csv
+import hashlib
+import json
+import subprocess
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+from main import (
+    BOT_LANGUAGE_MAP, DEFAULT_CONFIG, LANGUAGE_PACKS, PREFILTER, PREFILTER_BOT_LANGUAGES, STAGES,
+    CheckConfig, VerdictCache, get_detector, load_bot_language_packs, run_language_check,
+)
+from prefilter import is_latin_script
+
+DEFAULT_CONFIGS = [{"name": "default"}]
+CONFIG_FIELDS = {
+    "stages", "use_pack_models", "pack_model_min_score", "lingua_min_relative_distance",
+    "prefilter_min_margin", "prefilter_min_ngrams",
+}
+
+
+def _parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y", "supported")
+
+
+def load_corpus(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    corpus = []
+    for row in rows:
+        entry = {"text": row["text"], "bot_id": row["bot_id"], "supported": _parse_bool(row["supported"])}
+        if row.get("language"):
+            entry["language"] = row["language"]
+        corpus.append(entry)
+    return corpus
+
+
+def load_configs(path: str | None) -> list[dict]:
+    if not path:
+        return DEFAULT_CONFIGS
+    with open(path, encoding="utf-8") as f:
+        configs = json.load(f)
+    for spec in configs:
+        unknown = [stage for stage in spec.get("stages", []) if stage not in STAGES]
+        if unknown:
+            raise SystemExit(f"config {spec.get('name')!r}: unknown stages {unknown}; choose from {list(STAGES)}")
+    return configs
+
+
+def bot_family(bot_id: str) -> str:
+    return bot_id.split("_", 1)[0]
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _scores(matrix: Counter) -> dict:
+    tp, fp, tn, fn = matrix["tp"], matrix["fp"], matrix["tn"], matrix["fn"]
+    total = tp + fp + tn + fn
+    return {
+        "tp": tp, "fp": fp, "tn": tn, "fn": fn,
+        "accuracy": (tp + tn) / total if total else 0.0,
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / (tp + fn) if tp + fn else 0.0,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def warm_up(corpus: list[dict], config: CheckConfig) -> None:
+    """
+    Pays the lazy costs outside the timed loop: the specialized models, a lingua
+    detector per bot language set at this config's distance, and the language
+    models lingua loads on first use. The pass is uncached so it cannot pre-fill
+    the cache being measured.
+    """
+    load_bot_language_packs()
+    for languages in {tuple(languages) for languages in BOT_LANGUAGE_MAP.values()}:
+        get_detector(config.lingua_min_relative_distance, list(languages))
+    for row in corpus:
+        run_language_check(row["bot_id"], row["text"], config, None)
+
+
+def loaded_models(corpus: list[dict]) -> dict:
+    """Active version (None if it failed to load) of every pack model the corpus's bots use."""
+    languages = {lang for row in corpus for lang in BOT_LANGUAGE_MAP.get(row["bot_id"], [])}
+    return {
+        pack.name: {
+            "version": pack.models.active.version if pack.models.active is not None else None,
+            "load_error": pack.models.active_error,
+        }
+        for pack in LANGUAGE_PACKS.packs_for(sorted(languages)) if pack.has_model
+    }
+
+
+def evaluate(corpus: list[dict], spec: dict, passes: int = 1) -> dict:
+    """Runs the corpus through one configuration; 'supported' is the positive class."""
+    config = CheckConfig(**{
+        key: tuple(value) if key == "stages" else value
+        for key, value in spec.items() if key in CONFIG_FIELDS
+    })
+    cache_size = spec.get("cache_size", 0)
+    cache = VerdictCache(cache_size) if cache_size else None
+
+    warm_up(corpus, config)
+
+    families = defaultdict(Counter)
+    stage_usage = Counter()
+    latencies = []
+
+    start = time.perf_counter()
+    for _ in range(passes):
+        for row in corpus:
+            t0 = time.perf_counter()
+            check = run_language_check(row["bot_id"], row["text"], config, cache)
+            latencies.append(time.perf_counter() - t0)
+
+            predicted, expected = check.supported, row["supported"]
+            outcome = ("t" if predicted == expected else "f") + ("p" if predicted else "n")
+            families[bot_family(row["bot_id"])][outcome] += 1
+            stage_usage.update(check.used)
+    elapsed = time.perf_counter() - start
+
+    # A run that wanted a pack model but ran without it measures a different cascade.
+    models = loaded_models(corpus)
+    degraded = config.use_pack_models and "pack_model" in config.stages and any(
+        model["version"] is None for model in models.values()
+    )
+
+    overall = Counter()
+    for matrix in families.values():
+        overall.update(matrix)
+    latencies.sort()
+
+    return {
+        "name": spec.get("name", "unnamed"),
+        "config": {
+            **{field: getattr(config, field) for field in sorted(CONFIG_FIELDS)},
+            "stages": list(config.stages),
+            "cache_size": cache_size,
+        },
+        "samples": len(latencies),
+        "throughput_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "mean": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50": 1000 * _percentile(latencies, 50),
+            "p95": 1000 * _percentile(latencies, 95),
+            "p99": 1000 * _percentile(latencies, 99),
+        },
+        "overall": _scores(overall),
+        "families": {family: _scores(matrix) for family, matrix in sorted(families.items())},
+        "stage_usage": dict(stage_usage),
+        "models": models,
+        "degraded": degraded,
+    }
+
+
+def evaluate_prefilter(corpus: list[dict], min_margin: float, min_ngrams: int) -> dict:
+    """
+    Measures the trigram pre-filter on its own over the rows it is eligible for:
+    how often it decides, how often its verdict matches the label, and how often
+    it agrees with lingua. Rows with a "language" field also score the language
+    it picked, which the supported label alone can hide (French text read as
+    English is still "supported" for a Parisian bot).
+    """
+    detector = get_detector()
+    eligible = decided = correct = agree_lingua = labelled = language_correct = 0
+    confusion = Counter()
+    latencies = []
+
+    for row in corpus:
+        languages = BOT_LANGUAGE_MAP.get(row["bot_id"])
+        if not languages or not PREFILTER_BOT_LANGUAGES.issuperset(languages) or not is_latin_script(row["text"]):
+            continue
+        eligible += 1
+        t0 = time.perf_counter()
+        predicted = PREFILTER.predict(row["text"], min_margin, min_ngrams)
+        latencies.append(time.perf_counter() - t0)
+        if predicted is None:
+            continue
+
+        decided += 1
+        supported = predicted in languages
+        correct += supported == row["supported"]
+        confusion[("t" if supported == row["supported"] else "f") + ("p" if supported else "n")] += 1
+        lingua = detector.detect_language_of(row["text"])
+        agree_lingua += lingua is not None and LANGUAGE_PACKS.name_for(lingua, languages) == predicted
+        if "language" in row:
+            labelled += 1
+            language_correct += row["language"] == predicted
+
+    latencies.sort()
+    return {
+        "name": f"prefilter margin={min_margin} ngrams={min_ngrams}",
+        "eligible": eligible,
+        "decided": decided,
+        "coverage": decided / eligible if eligible else 0.0,
+        "precision": correct / decided if decided else 0.0,
+        "lingua_agreement": agree_lingua / decided if decided else 0.0,
+        "language_accuracy": language_correct / labelled if labelled else None,
+        "confusion": _scores(confusion),
+        "latency_us": {
+            "mean": 1e6 * sum(latencies) / len(latencies) if latencies else 0.0,
+            "p99": 1e6 * _percentile(latencies, 99),
+        },
+    }
+
+
+def print_summary(records: list[dict]) -> None:
+    header = f"{'config':<24} {'commit':<9} {'acc':>6} {'prec':>6} {'rec':>6} {'req/s':>10} {'p50 ms':>8} {'p95 ms':>8}"
+    print(header)
+    print("-" * len(header))
+    for record in records:
+        overall, latency = record["overall"], record["latency_ms"]
+        print(
+            f"{record['name']:<24} {record.get('commit') or '-':<9} "
+            f"{overall['accuracy']:>6.3f} {overall['precision']:>6.3f} {overall['recall']:>6.3f} "
+            f"{record['throughput_per_s']:>10.1f} {latency['p50']:>8.2f} {latency['p95']:>8.2f}"
+        )
+        if record.get("degraded"):
+            missing = [name for name, model in record["models"].items() if model["version"] is None]
+            print(f"  DEGRADED: ran without the {', '.join(missing)} model(s); not comparable with full runs")
+        for family, scores in record["families"].items():
+            print(
+                f"  {family:<22} {'':<9} {scores['accuracy']:>6.3f} {scores['precision']:>6.3f} {scores['recall']:>6.3f}"
+                f"   tp={scores['tp']} fp={scores['fp']} tn={scores['tn']} fn={scores['fn']}"
+            )
+
+
+def cmd_run(args) -> None:
+    corpus = load_corpus(args.corpus)
+    with open(args.corpus, "rb") as f:
+        corpus_sha = hashlib.sha256(f.read()).hexdigest()[:16]
+
+    records = []
+    for spec in load_configs(args.configs):
+        record = evaluate(corpus, spec, args.passes)
+        record.update({
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "corpus": args.corpus,
+            "corpus_sha256": corpus_sha,
+            "passes": args.passes,
+        })
+        records.append(record)
+
+    with open(args.output, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print_summary(records)
+    print(f"\nAppended {len(records)} result(s) to {args.output}")
+
+
+def cmd_prefilter(args) -> None:
+    corpus = load_corpus(args.corpus)
+    for min_ngrams in args.min_ngrams:
+        for margin in args.margins:
+            record = evaluate_prefilter(corpus, margin, min_ngrams)
+            language = record["language_accuracy"]
+            print(
+                f"{record['name']:<32} eligible={record['eligible']} decided={record['decided']} "
+                f"coverage={record['coverage']:.3f} precision={record['precision']:.3f} "
+                f"language={'-' if language is None else f'{language:.3f}'} "
+                f"lingua_agreement={record['lingua_agreement']:.3f} "
+                f"mean={record['latency_us']['mean']:.1f}us p99={record['latency_us']['p99']:.1f}us"
+            )
+
+
+def cmd_compare(args) -> None:
+    with open(args.results, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if args.corpus_sha256:
+        records = [r for r in records if r["corpus_sha256"] == args.corpus_sha256]
+    if not args.include_degraded:
+        degraded = sum(bool(r.get("degraded")) for r in records)
+        records = [r for r in records if not r.get("degraded")]
+        if degraded:
+            print(f"Skipped {degraded} degraded run(s) missing a pack model; pass --include-degraded to show them.\n")
+    print_summary(records)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="evaluate configurations over a labelled corpus")
+    run.add_argument("corpus", help="JSONL or CSV with text, bot_id, supported")
+    run.add_argument("--configs", help="JSON list of configurations (default: the service defaults)")
+    run.add_argument("--passes", type=int, default=1, help="times to run the corpus; >1 shows warm-cache latency")
+    run.add_argument("--output", default="eval_results.jsonl")
+    run.set_defaults(func=cmd_run)
+
+    prefilter = sub.add_parser("prefilter", help="precision/coverage of the trigram pre-filter")
+    prefilter.add_argument("corpus", help="JSONL or CSV with text, bot_id, supported")
+    prefilter.add_argument(
+        "--margins", type=float, nargs="+", default=[DEFAULT_CONFIG.prefilter_min_margin],
+        help="per-trigram score margins to sweep",
+    )
+    prefilter.add_argument(
+        "--min-ngrams", type=int, nargs="+", default=[DEFAULT_CONFIG.prefilter_min_ngrams],
+        help="minimum trigram counts to sweep",
+    )
+    prefilter.set_defaults(func=cmd_prefilter)
+
+    compare = sub.add_parser("compare", help="tabulate stored results")
+    compare.add_argument("results", nargs="?", default="eval_results.jsonl")
+    compare.add_argument("--corpus-sha256", help="only show runs over this corpus")
+    compare.add_argument("--include-degraded", action="store_true", help="also show runs missing a pack model")
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
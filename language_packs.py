@@ -0,0 +1,230 @@
+"""
+Language packs: everything the cascade needs to know about one language.
+
+A pack bundles the lingua enum, greeting/keyword list, native script ranges and an
+optional specialized model for romanized input (e.g. hing-bert-lid for Hindi).
+Registering a pack is cheap. Models and lingua detectors are only built when a bot
+that uses the pack needs them. Per-request work depends only on the bot's own
+languages and the input's tokens, not on how many packs are registered.
+"""
+import re
+import threading
+from dataclasses import dataclass, field
+from lingua import Language, LanguageDetectorBuilder
+
+from model_registry import ModelRegistry
+
+_TOKEN_RE = re.compile(r"\b\w+\b")
+
+
+def normalize_and_tokenize(text: str) -> list[str]:
+    # Remove punctuation and split into lowercase words
+    return _TOKEN_RE.findall(text.lower())
+
+
+class TextAnalysis:
+    """
+    Tokens and per-pack script checks for one input, computed on first use.
+    extend() builds the analysis for an edited text, reusing the work done
+    for the unchanged prefix (used by the streaming endpoint).
+    """
+    __slots__ = ("text", "lowered", "_tokens", "_ends", "_scripts")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lowered = text.lower()
+        self._tokens = None
+        self._ends = None
+        self._scripts = {}
+
+    @property
+    def tokens(self) -> list[str]:
+        if self._tokens is None:
+            self._tokens, self._ends = [], []
+            self._scan_from(0)
+        return self._tokens
+
+    def _scan_from(self, position: int) -> None:
+        for match in _TOKEN_RE.finditer(self.lowered, position):
+            self._tokens.append(match.group())
+            self._ends.append(match.end())
+
+    def in_script(self, pack: "LanguagePack") -> bool:
+        entry = self._scripts.get(pack.name)
+        if entry is None:
+            entry = self._scripts[pack.name] = (pack, pack.in_script(self.text))
+        return entry[1]
+
+    def extend(self, text: str) -> "TextAnalysis":
+        updated = TextAnalysis(text)
+        if len(updated.lowered) != len(text) or len(self.lowered) != len(self.text):
+            return updated  # lowercasing changed lengths; offsets are not comparable
+
+        prefix = 0
+        limit = min(len(self.lowered), len(updated.lowered))
+        while prefix < limit and self.lowered[prefix] == updated.lowered[prefix]:
+            prefix += 1
+
+        if self._tokens is not None:
+            # Tokens that end before the prefix does are complete and unchanged.
+            keep = 0
+            while keep < len(self._ends) and self._ends[keep] < prefix:
+                keep += 1
+            updated._tokens = self._tokens[:keep]
+            updated._ends = self._ends[:keep]
+            updated._scan_from(updated._ends[-1] if keep else 0)
+
+        # A script seen in the kept prefix is still there; one not seen can only appear in the new tail.
+        tail = text[prefix:]
+        for name, (pack, hit) in self._scripts.items():
+            if hit and prefix == len(self.text):
+                updated._scripts[name] = (pack, True)
+            elif not hit:
+                updated._scripts[name] = (pack, pack.in_script(tail))
+        return updated
+
+
+@dataclass(eq=False)
+class LanguagePack:
+    name: str
+    lingua: Language
+    keywords: list[str]
+    # Native script, e.g. (("ऀ", "ॿ"),) for Devanagari; input in it goes straight to lingua.
+    script_name: str | None = None
+    script_ranges: tuple[tuple[str, str], ...] = ()
+    # Specialized model for input outside the native script, loaded on first use.
+    models: ModelRegistry | None = None
+    model_tag: str | None = None
+    # Model label -> language name, e.g. {"hin": "hindi", "eng": "english"}.
+    model_labels: dict[str, str] = field(default_factory=dict)
+
+    def in_script(self, text: str) -> bool:
+        return any(low <= char <= high for char in text for low, high in self.script_ranges)
+
+    @property
+    def has_model(self) -> bool:
+        return self.models is not None
+
+
+class PackRegistry:
+    """
+    Registered language packs plus the lazily built lookups that keep per-request
+    cost independent of the number of packs.
+    """
+
+    def __init__(self, core_languages: list[Language]):
+        # Languages every detector includes, so common off-language input can still be rejected.
+        self.core_languages = frozenset(core_languages)
+        self._packs = {}
+        self._keyword_index = None
+        self._lingua_names = None
+        self._detectors = {}
+        self._bot_detectors = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._packs
+
+    def __getitem__(self, name: str) -> LanguagePack:
+        return self._packs[name]
+
+    def __iter__(self):
+        return iter(self._packs.values())
+
+    def __len__(self) -> int:
+        return len(self._packs)
+
+    def register(self, pack: LanguagePack) -> LanguagePack:
+        self._packs[pack.name] = pack
+        self._keyword_index = None
+        self._lingua_names = None
+        return pack
+
+    def packs_for(self, languages: list[str]) -> list[LanguagePack]:
+        return [self._packs[name] for name in languages if name in self._packs]
+
+    @property
+    def keyword_index(self) -> dict[str, tuple[str, ...]]:
+        """
+        Token -> languages whose keyword list contains it, in registration order.
+        Only single-token keywords are indexed, since matching is done per token.
+        """
+        if self._keyword_index is None:
+            index = {}
+            for pack in self._packs.values():
+                for keyword in pack.keywords:
+                    if normalize_and_tokenize(keyword) == [keyword]:
+                        langs = index.setdefault(keyword, [])
+                        if pack.name not in langs:
+                            langs.append(pack.name)
+            self._keyword_index = {token: tuple(langs) for token, langs in index.items()}
+        return self._keyword_index
+
+    def name_for(self, language: Language, bot_languages: list[str] = ()) -> str:
+        """
+        Pack name for a lingua result, preferring the bot's own packs, so a pack named
+        e.g. "hinglish" or "brazilian_portuguese" is matched through its lingua enum.
+        Languages without a pack fall back to the lowercased enum name.
+        """
+        for pack in self.packs_for(bot_languages):
+            if pack.lingua == language:
+                return pack.name
+        if self._lingua_names is None:
+            names = {}
+            for pack in self._packs.values():
+                names.setdefault(pack.lingua, pack.name)
+            self._lingua_names = names
+        return self._lingua_names.get(language) or language.name.lower()
+
+    def match_keyword(self, tokens: list[str], bot_languages: list[str]) -> str | None:
+        """First of the bot's languages with a matching keyword, otherwise the first other pack that matches."""
+        index = self.keyword_index
+        matched = set()
+        for token in tokens:
+            matched.update(index.get(token, ()))
+        if not matched:
+            return None
+        for lang in bot_languages:
+            if lang in matched:
+                return lang
+        for pack in self._packs.values():
+            if pack.name in matched:
+                return pack.name
+        return None
+
+    def experimenting(self, bot_languages: list[str]) -> bool:
+        """True while any of the bot's packs has a candidate model taking traffic or shadowing."""
+        return any(pack.has_model and pack.models.experimenting for pack in self.packs_for(bot_languages))
+
+    def add_detector(self, detector, languages, min_relative_distance: float = 0.0) -> None:
+        self._detectors[(frozenset(languages), min_relative_distance)] = detector
+
+    def detector(self, bot_languages: list[str], min_relative_distance: float = 0.0):
+        """Lingua detector over the bot's languages plus the core set, built once per distinct set."""
+        bot_key = (tuple(bot_languages), min_relative_distance)
+        detector = self._bot_detectors.get(bot_key)
+        if detector is not None:
+            return detector
+
+        languages = self.core_languages.union(pack.lingua for pack in self.packs_for(bot_languages))
+        key = (languages, min_relative_distance)
+        detector = self._detectors.get(key)
+        if detector is None:
+            with self._lock:
+                detector = self._detectors.get(key)
+                if detector is None:
+                    detector = (
+                        LanguageDetectorBuilder.from_languages(*languages)
+                        .with_minimum_relative_distance(min_relative_distance)
+                        .build()
+                    )
+                    self._detectors[key] = detector
+        self._bot_detectors[bot_key] = detector
+        return detector
+
+    def load(self, bot_languages: list[str]) -> None:
+        """Loads the models and detector a bot needs, e.g. at startup for every configured bot."""
+        for pack in self.packs_for(bot_languages):
+            if pack.has_model:
+                pack.models.ensure_loaded()
+        self.detector(bot_languages)
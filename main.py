@@ -1,38 +1,63 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
 import torch
-import re
-from fastapi import FastAPI
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from pydantic import BaseModel
 from lingua import Language, LanguageDetectorBuilder
 from transformers import pipeline
 from fastapi.middleware.cors import CORSMiddleware
+from check_result import CheckResult
+from language_packs import LanguagePack, PackRegistry, TextAnalysis, normalize_and_tokenize
+from model_registry import ModelRegistry, ModelVersion
+from prefilter import FUNCTION_WORDS, NgramPrefilter, is_latin_script
+from result_store import ResultStore
+from streaming import StreamSession
+from tracing import PROFILER_ENABLED, request_trace, sample_stacks, span
 
 # --- Model & Detector Setup ---
 
 # 1. Lingua Language Detector Setup
+# Core languages every detector includes; language packs can add more per bot.
 ALL_SUPPORTED_LANGUAGES = [
     Language.ENGLISH, Language.HINDI, Language.JAPANESE, Language.FRENCH, Language.GERMAN
 ]
 DETECTOR = LanguageDetectorBuilder.from_languages(*ALL_SUPPORTED_LANGUAGES).with_preloaded_language_models().build()
 
-# 2. Specialized Hinglish Detector Model
-try:
-    HINGLISH_MODEL_NAME = "l3cube-pune/hing-bert-lid"
-    device = 0 if torch.cuda.is_available() else -1
-    HINGLISH_DETECTOR = pipeline(
-        "text-classification",
-        model=HINGLISH_MODEL_NAME,
-        device=device
-    )
-    print(f"Hinglish detector model '{HINGLISH_MODEL_NAME}' loaded successfully.")
-except Exception as e:
-    print(f"CRITICAL: Failed to load Hinglish model. Hinglish checks will be skipped. Error: {e}")
-    HINGLISH_DETECTOR = None
+# 2. Specialized Hinglish Detector Model (loaded by the Hindi language pack)
+# Newer versions can be loaded from a local path at runtime through the /models API.
+HINGLISH_MODEL_NAME = "l3cube-pune/hing-bert-lid"
 
 
+def load_hinglish_detector(source: str = HINGLISH_MODEL_NAME):
+    try:
+        device = 0 if torch.cuda.is_available() else -1
+        detector = pipeline(
+            "text-classification",
+            model=source,
+            device=device
+        )
+        print(f"Hinglish detector model '{source}' loaded successfully.")
+        return detector
+    except Exception as e:
+        print(f"CRITICAL: Failed to load Hinglish model '{source}'. Hinglish checks will be skipped. Error: {e}")
+        return None
+
+
+HINGLISH_MODELS = ModelRegistry("hinglish", load_hinglish_detector, HINGLISH_MODEL_NAME)
 
 
 
-app = FastAPI()
+
+
+app = FastAPI(default_response_class=ORJSONResponse)
 
 
 
@@ -665,61 +690,89 @@ english_keywords = [
 
 
 
-KEYWORD_MAP = {
-    "hindi": hindi_keywords,
-    "japanese": japanese_keywords,
-    "french": french_keywords,
-    "german": german_keywords,
-    "english": english_keywords,
-}
+# --- Language Packs ---
+# Registration order is the priority order for unsupported keyword matches.
+HINGLISH_LABELS = {"hin": "hindi", "hin-eng": "hindi", "hi": "hindi", "eng": "english", "en": "english"}
 
+LANGUAGE_PACKS = PackRegistry(ALL_SUPPORTED_LANGUAGES)
+LANGUAGE_PACKS.add_detector(DETECTOR, ALL_SUPPORTED_LANGUAGES)
+LANGUAGE_PACKS.register(LanguagePack(
+    "hindi", Language.HINDI, hindi_keywords,
+    script_name="devanagari",
+    script_ranges=(('\u0900', '\u097F'),),
+    models=HINGLISH_MODELS,
+    model_tag="hinglish_model",
+    model_labels=HINGLISH_LABELS,
+))
+LANGUAGE_PACKS.register(LanguagePack("japanese", Language.JAPANESE, japanese_keywords))
+LANGUAGE_PACKS.register(LanguagePack("french", Language.FRENCH, french_keywords))
+LANGUAGE_PACKS.register(LanguagePack("german", Language.GERMAN, german_keywords))
+LANGUAGE_PACKS.register(LanguagePack("english", Language.ENGLISH, english_keywords))
 
-def normalize_and_tokenize(text: str) -> list[str]:
-    # Remove punctuation and split into lowercase words
-    return re.findall(r"\b\w+\b", text.lower())
+KEYWORD_MAP = {pack.name: pack.keywords for pack in LANGUAGE_PACKS}
 
 
-def detect_any_greeting_language(user_input: str, bot_languages: list[str]) -> str | None:
+def load_bot_language_packs() -> None:
+    # Load only what the configured bots use; registered-but-unused packs cost nothing.
+    for bot_languages in {tuple(languages) for languages in BOT_LANGUAGE_MAP.values()}:
+        LANGUAGE_PACKS.load(list(bot_languages))
+
+
+def detect_any_greeting_language(user_input: str, bot_languages: list[str], tokens: list[str] | None = None) -> str | None:
     """
     Returns a matched greeting language only if input is 2–3 words long.
     Prioritizes the languages supported by the bot.
     """
-    tokens = normalize_and_tokenize(user_input)
+    if tokens is None:
+        tokens = normalize_and_tokenize(user_input)
 
     # ✅ Match only if input has between 2 and 3 words
     if len(tokens) < 2 or len(tokens) > 3:
         return None  # 🟡 Skip keyword detection for long inputs
 
-    # 1. First try to match supported languages
-    for lang in bot_languages:
-        if lang in KEYWORD_MAP:
-            for word in KEYWORD_MAP[lang]:
-                if word in tokens:
-                    return lang
-
-    # 2. Then check for unsupported keyword matches (to reject)
-    for lang in KEYWORD_MAP:
-        if lang not in bot_languages:
-            for word in KEYWORD_MAP[lang]:
-                if word in tokens:
-                    return lang
-
-   return None
+    # One index lookup per token, however many language packs are registered
+    return LANGUAGE_PACKS.match_keyword(tokens, bot_languages)
 
 
-def detect_language_with_model(text: str) -> str | None:
-    """Uses the specialized model to get a language label ('hin', 'eng', 'hin-eng')."""
-    if not HINGLISH_DETECTOR or not isinstance(text, str) or not text.strip():
-        return None
+def detect_language_with_model(
+    pack: LanguagePack, text: str, min_score: float = 0.0
+) -> tuple[str | None, ModelVersion | None]:
+    """
+    Uses the pack's specialized model to get a language label (e.g. 'hin', 'eng', 'hin-eng'),
+    along with the version that produced it. Predictions scoring below min_score are
+    treated as no prediction.
+    """
+    if not isinstance(text, str) or not text.strip():
+        return None, None
+    version = pack.models.route(text)
+    label = predict_with_model(version, text, min_score) if version is not None else None
+    # Runs even without an active model, which is when a shadowed replacement matters most.
+    pack.models.shadow_compare(text, label, lambda candidate, t: predict_with_model(candidate, t, min_score))
+    return label, version
+
+
+def predict_with_model(version: ModelVersion, text: str, min_score: float = 0.0) -> str | None:
+    """Runs one model version, recording its latency and failures."""
+    model = version.model
+    start = time.perf_counter()
     try:
-        prediction = HINGLISH_DETECTOR(text)[0]
+        # Run the pipeline steps separately so tokenization and the forward pass get their own spans.
+        with span("model.tokenize", model=version.version):
+            model_inputs = model.preprocess(text)
+        with span("model.forward", model=version.version):
+            model_outputs = model.forward(model_inputs)
+        with span("model.postprocess", model=version.version):
+            prediction = model.postprocess(model_outputs)
+        if isinstance(prediction, list):
+            prediction = prediction[0]
+        version.record(time.perf_counter() - start, ok=True)
+        if prediction.get('score', 1.0) < min_score:
+            return None
         return prediction['label']  # Return the actual label (e.g., 'hin')
     except Exception:
+        version.record(time.perf_counter() - start, ok=False)
         return None
 
-def is_devanagari(text: str) -> bool:
-    return any('\u0900' <= char <= '\u097F' for char in text)
-
 
 # -----------------------------
 # --- FastAPI Request Model ---
@@ -729,116 +782,487 @@ class InputPayload(BaseModel):
     bot_id: str
     user_input: str
 
+
+# -----------------------------
+# --- Response Model ---
+# -----------------------------
+
+# Production callers can drop debug_info from every response by setting
+# LANGUAGE_CHECK_DEBUG_INFO=0; a per-request ?debug=true/false still wins.
+DEBUG_INFO_DEFAULT = os.getenv("LANGUAGE_CHECK_DEBUG_INFO", "1").lower() not in ("0", "false", "no")
+
+INVALID_BOT_MESSAGE = "Invalid bot_id. Please check your bot selection."
+
+
+# -----------------------------
+# --- Cascade Configuration ---
+# -----------------------------
+
+# Stages run in this order; each one either settles the verdict or falls through.
+DEFAULT_STAGES = ("native_script", "pack_model", "keyword", "prefilter", "lingua")
+
+
+@dataclass(frozen=True)
+class CheckConfig:
+    stages: tuple[str, ...] = DEFAULT_STAGES
+    use_pack_models: bool = True
+    pack_model_min_score: float = 0.0
+    lingua_min_relative_distance: float = 0.0
+    # Swept with `evaluate.py prefilter eval/latin_tune.jsonl`: the lowest margin with no
+    # wrong verdicts there (0.5 already reads a Portuguese row as French). On the held-out
+    # eval/latin_heldout.jsonl it decides 67 of 187 rows, all correctly; that bounds the
+    # error rate at roughly 4%, not zero, so grow the held-out set before lowering this.
+    prefilter_min_margin: float = 0.6
+    prefilter_min_ngrams: int = 12
+
+
+DEFAULT_CONFIG = CheckConfig()
+
+def get_detector(min_relative_distance: float = 0.0, languages: list[str] | None = None):
+    """Returns the lingua detector for a bot's languages (core set only if None), built lazily."""
+    return LANGUAGE_PACKS.detector(languages or [], min_relative_distance)
+
+
+def detect_with_lingua(text: str, languages: list[str], min_relative_distance: float = 0.0):
+    with span("lingua.detect", min_relative_distance=min_relative_distance):
+        return get_detector(min_relative_distance, languages).detect_language_of(text)
+
+
+class VerdictCache:
+    """
+    LRU of cascade verdicts keyed by (supported languages, raw input). The key is
+    the exact text the cascade ran on, since lingua and the models are sensitive
+    to normalization and whitespace.
+    A maxsize of 0 disables caching. With a ResultStore attached, new verdicts
+    and hits are written through so the next instance can warm up from them.
+    Safe to share between the event loop and the stream check workers.
+    """
+
+    def __init__(self, maxsize: int, store: ResultStore | None = None):
+        self.maxsize = maxsize
+        self.store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None and self.store is not None:
+            self.store.record(key)
+        return entry
+
+    def put(self, key, verdict) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = verdict
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        if self.store is not None:
+            self.store.record(key, verdict)
+
+    def warm(self) -> int:
+        """Loads the store's most frequent verdicts; returns how many were loaded."""
+        if self.store is None or self.maxsize <= 0:
+            return 0
+        entries = self.store.load(self.maxsize)
+        with self._lock:
+            # Least frequent first, so the hottest entries end up most recently used.
+            for key, verdict in reversed(entries):
+                self._entries[key] = verdict
+            return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Trigram pre-filter over the packs for lingua's five core languages, keyed by pack
+# name and seeded from their keywords. Only bots whose languages are all Latin-script use it.
+PREFILTER = NgramPrefilter.from_samples({
+    pack.name: pack.keywords + FUNCTION_WORDS.get(pack.name, [])
+    for pack in LANGUAGE_PACKS if pack.lingua in ALL_SUPPORTED_LANGUAGES
+})
+PREFILTER_BOT_LANGUAGES = {"english", "french", "german"}
+
+def result_store_version() -> str:
+    """
+    Anything that can change a verdict goes into the store version, so a new model,
+    keyword list or cascade default invalidates persisted entries automatically.
+    """
+    return hashlib.sha256(json.dumps({
+        "models": {pack.name: pack.models.current_version for pack in LANGUAGE_PACKS if pack.has_model},
+        "keywords": KEYWORD_MAP,
+        "function_words": FUNCTION_WORDS,
+        "config": repr(DEFAULT_CONFIG),
+    }, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+RESULT_STORE_VERSION = result_store_version()
+RESULT_STORE_PATH = os.getenv("LANGUAGE_CHECK_RESULT_STORE")
+RESULT_STORE = ResultStore(
+    RESULT_STORE_PATH,
+    RESULT_STORE_VERSION,
+    max_rows=int(os.getenv("LANGUAGE_CHECK_RESULT_STORE_MAX_ROWS", "100000")),
+    max_age=86400 * float(os.getenv("LANGUAGE_CHECK_RESULT_STORE_MAX_AGE_DAYS", "30")),
+    # On Cloud Run: LANGUAGE_CHECK_RESULT_STORE on local disk, the snapshot on a mounted volume.
+    snapshot=os.getenv("LANGUAGE_CHECK_RESULT_STORE_SNAPSHOT"),
+) if RESULT_STORE_PATH else None
+
+# Off by default so live traffic always runs the full cascade. Turning on the result
+# store opts into caching, since the store is written through the cache.
+RESULT_CACHE = VerdictCache(
+    int(os.getenv("LANGUAGE_CHECK_CACHE_SIZE", "4096" if RESULT_STORE is not None else "0")),
+    store=RESULT_STORE,
+)
+if RESULT_STORE is not None:
+    print(f"Result store '{RESULT_STORE_PATH}' (version {RESULT_STORE_VERSION}): pre-warmed {RESULT_CACHE.warm()} verdicts.")
+
+
+# -----------------------------
+# --- Language Detection Logic ---
+# -----------------------------
+
+def _settle(check: CheckResult, detected_lang: str, supported_languages: list[str], stage: str) -> CheckResult:
+    check.detected_language = detected_lang
+    if detected_lang in supported_languages:
+        return check.accept(f"accepted: {stage}")
+    return check.reject(f"rejected: {stage}", BOT_PERSONALITY_MAP[check.bot_id])
+
+
+def native_script_stage(check: CheckResult, supported_languages: list[str], config: CheckConfig) -> CheckResult | None:
+    # Input in one of the bot's native scripts (e.g. Devanagari for Hindi) goes straight to lingua.
+    for pack in LANGUAGE_PACKS.packs_for(supported_languages):
+        if pack.script_ranges and check.analysis.in_script(pack):
+            check.used.append(f"{pack.script_name} -> lingua")
+            detected_language_enum = detect_with_lingua(
+                check.user_input, supported_languages, config.lingua_min_relative_distance
+            )
+            if detected_language_enum:
+                detected_lang = LANGUAGE_PACKS.name_for(detected_language_enum, supported_languages)
+                return _settle(check, detected_lang, supported_languages, f"{pack.script_name} lingua")
+            return None
+    return None
+
+
+def pack_model_stage(check: CheckResult, supported_languages: list[str], config: CheckConfig) -> CheckResult | None:
+    # Romanized input (e.g. Hinglish) goes through the pack's specialized model.
+    if not config.use_pack_models:
+        return None
+    for pack in LANGUAGE_PACKS.packs_for(supported_languages):
+        if not pack.has_model or check.analysis.in_script(pack):
+            continue
+        check.used.append(pack.model_tag)
+        model_detected_label, version = detect_language_with_model(pack, check.user_input, config.pack_model_min_score)
+        if version is not pack.models.active:
+            # Served by a candidate: the cache and store only hold active-version verdicts.
+            check.cacheable = False
+        if not model_detected_label:
+            check.used.append(f"{pack.model_tag}_failed")
+            check.cacheable = False
+            continue
+
+        label = model_detected_label.lower()
+        check.detected_language = label
+        check.supported_languages = supported_languages
+        if pack.model_labels.get(label) in supported_languages:
+            # Plain "accepted" is what clients have always seen for a pack-model accept.
+            return check.accept("accepted")
+        return check.reject(f"rejected: {pack.model_tag}", BOT_PERSONALITY_MAP[check.bot_id])
+    return None
+
+
+def keyword_stage(check: CheckResult, supported_languages: list[str], config: CheckConfig) -> CheckResult | None:
+    # Greeting/Keyword Detection (runs only for 2–3 word inputs)
+    detected_greeting_lang = detect_any_greeting_language(check.user_input, supported_languages, check.analysis.tokens)
+    if not detected_greeting_lang:
+        return None
+    check.used.append("keyword_match")
+    check.detected_language = detected_greeting_lang
+    if detected_greeting_lang in supported_languages:
+        return check.accept("accepted: keyword in supported")
+    return check.reject("rejected: keyword in unsupported", BOT_PERSONALITY_MAP[check.bot_id])
+
+
+def prefilter_stage(check: CheckResult, supported_languages: list[str], config: CheckConfig) -> CheckResult | None:
+    # Cheap trigram verdict for Parisian/Berlin bots; undecided input falls through to lingua.
+    if not PREFILTER_BOT_LANGUAGES.issuperset(supported_languages) or not is_latin_script(check.user_input):
+        return None
+    detected_lang = PREFILTER.predict(check.user_input, config.prefilter_min_margin, config.prefilter_min_ngrams)
+    if detected_lang is None:
+        return None
+    check.used.append("ngram_prefilter")
+    return _settle(check, detected_lang, supported_languages, "ngram prefilter")
+
+
+def lingua_stage(check: CheckResult, supported_languages: list[str], config: CheckConfig) -> CheckResult | None:
+    check.used.append("final_lingua_fallback")
+    detected_language_enum = detect_with_lingua(check.user_input, supported_languages, config.lingua_min_relative_distance)
+    if detected_language_enum:
+        detected_lang = LANGUAGE_PACKS.name_for(detected_language_enum, supported_languages)
+        return _settle(check, detected_lang, supported_languages, "fallback lingua")
+    return None
+
+
+STAGES = {
+    "native_script": native_script_stage,
+    "pack_model": pack_model_stage,
+    "keyword": keyword_stage,
+    "prefilter": prefilter_stage,
+    "lingua": lingua_stage,
+}
+
+
+def run_language_check(
+    bot_id: str,
+    user_input: str,
+    config: CheckConfig = DEFAULT_CONFIG,
+    cache: VerdictCache | None = RESULT_CACHE,
+    analysis: TextAnalysis | None = None,
+) -> CheckResult:
+    check = CheckResult(bot_id, user_input)
+    check.analysis = analysis if analysis is not None else TextAnalysis(user_input)
+
+    if bot_id not in BOT_LANGUAGE_MAP:
+        check.used.append("invalid_bot_id")
+        return check.reject(None, INVALID_BOT_MESSAGE)
+
+    supported_languages = BOT_LANGUAGE_MAP[bot_id]
+
+    cache_key = (tuple(supported_languages), user_input)
+    if cache is not None and LANGUAGE_PACKS.experimenting(supported_languages):
+        # A candidate model is in A/B or shadow mode: every input must reach it and
+        # its metrics, and its verdicts must not be cached.
+        cache = None
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            check.supported, check.result, check.detected_language, used, has_languages = cached
+            check.used = [*used, "cache_hit"]
+            if has_languages:
+                check.supported_languages = supported_languages
+            if not check.supported:
+                check.message = BOT_PERSONALITY_MAP[bot_id]
+            return check
+
+    for stage in config.stages:
+        with span(f"stage.{stage}"):
+            settled = STAGES[stage](check, supported_languages, config)
+        if settled is not None:
+            break
+    else:
+        # Nothing detected — allow fallback
+        check.used.append("final_fallback")
+        check.accept("accepted: no detection, assumed safe")
+
+    if cache is not None and check.cacheable:
+        cache.put(cache_key, (
+            check.supported, check.result, check.detected_language,
+            tuple(check.used), check.supported_languages is not None,
+        ))
+    return check
+
+
 # -----------------------------
 # --- Language Detection API ---
 # -----------------------------
 @app.post("/language_check")
-async def language_check(payload: InputPayload):
-    debug_info = {
-        "bot_id": payload.bot_id,
-        "input": payload.user_input,
-        "used": [],
-        "result": None,
-        "detected_language": None,
-    }
-
-    if payload.bot_id not in BOT_LANGUAGE_MAP:
-        debug_info["used"].append("invalid_bot_id")
-        return {
-            "supported": False,
-            "message": "Invalid bot_id. Please check your bot selection.",
-            "debug_info": debug_info
-        }
-
-    supported_languages = BOT_LANGUAGE_MAP[payload.bot_id]
-
-
-  # Step 0: If Hindi is supported, do Devanagari detection first
-    if 'hindi' in supported_languages :
-        if is_devanagari(payload.user_input):
-            debug_info["used"].append("devanagari -> lingua")
-            detected_language_enum = DETECTOR.detect_language_of(payload.user_input)
-            if detected_language_enum:
-                detected_lang = detected_language_enum.name.lower()
-                debug_info["detected_language"] = detected_lang
-                if detected_lang in supported_languages:
-                    debug_info["result"] = "accepted: devanagari lingua"
-                    return {"supported": True, "debug_info": debug_info}
+async def language_check(payload: InputPayload, debug: bool | None = None):
+    with request_trace("language_check", bot_id=payload.bot_id, input_chars=len(payload.user_input)):
+        check = run_language_check(payload.bot_id, payload.user_input)
+        include_debug = DEBUG_INFO_DEFAULT if debug is None else debug
+        # Returning the response directly skips FastAPI's jsonable_encoder pass.
+        with span("serialize"):
+            return ORJSONResponse(check.to_dict(include_debug))
+
+
+# Partial keystroke inputs get their own cache so they never reach the persistent store.
+STREAM_CACHE = VerdictCache(int(os.getenv("LANGUAGE_CHECK_STREAM_CACHE_SIZE", "4096")))
+
+# Stream checks run here, off the event loop, so a model or lingua call for one
+# connection does not stall every other socket. Bounded so a burst of typing
+# queues instead of starting a thread per keystroke.
+STREAM_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LANGUAGE_CHECK_STREAM_WORKERS", "4")),
+    thread_name_prefix="stream-check",
+)
+
+
+def check_stream_text(bot_id: str, text: str, analysis: TextAnalysis) -> CheckResult:
+    with request_trace("language_check_stream", bot_id=bot_id, input_chars=len(text)):
+        return run_language_check(bot_id, text, cache=STREAM_CACHE, analysis=analysis)
+
+
+@app.websocket("/ws/language_check")
+async def language_check_stream(websocket: WebSocket, bot_id: str, debounce_ms: int = 150):
+    """
+    Streams verdicts for text as it is typed; see streaming.py for the protocol.
+    Edits are debounced, and a verdict is only sent when it flips.
+    """
+    await websocket.accept()
+    if bot_id not in BOT_LANGUAGE_MAP:
+        await websocket.send_json({"supported": False, "message": INVALID_BOT_MESSAGE})
+        await websocket.close(code=1008)
+        return
+
+    session = StreamSession(bot_id)
+    debounce = max(debounce_ms, 0) / 1000
+    pending = False
+    try:
+        while True:
+            try:
+                if pending:
+                    message = await asyncio.wait_for(websocket.receive(), debounce)
                 else:
-                    debug_info["result"] = "rejected: devanagari lingua"
-                    return {"supported": False, "message": BOT_PERSONALITY_MAP[payload.bot_id], "debug_info": debug_info}
-        else:
-            # Hinglish model if Latin-script
-            debug_info["used"].append("hinglish_model")
-            model_detected_label = detect_language_with_model(payload.user_input)
-            if model_detected_label:
-                debug_info["detected_language"] = model_detected_label
-                label = model_detected_label.lower()
-
-                hindi_labels = ['hin', 'hin-eng', 'hi']
-                english_labels = ['eng', 'en']
-                
-                is_supported = (
-                    (label in hindi_labels and 'hindi' in supported_languages) or
-                    (label in english_labels and 'english' in supported_languages)
+                    message = await websocket.receive()
+            except asyncio.TimeoutError:
+                # Typing paused: check the settled text.
+                pending = False
+                if not session.text.strip():
+                    continue
+                check = await asyncio.get_running_loop().run_in_executor(
+                    STREAM_EXECUTOR, check_stream_text, bot_id, session.text, session.analysis
                 )
-                
-                if is_supported:
-                    debug_info["result"] = "accepted: hinglish_model"
-                    return {"supported": True, "debug_info": {
-                            "bot_id": payload.bot_id,
-                            "input": payload.user_input,
-                            "used": ["hinglish_model"],
-                            "result": "accepted",
-                            "detected_language": label,
-                            "supported_languages": supported_languages
-                }
-                    }
-                else:
-                    debug_info["result"] = "rejected: hinglish_model"
-                    return {"supported": False, "message": BOT_PERSONALITY_MAP[payload.bot_id], "debug_info": {
-                                    "bot_id": payload.bot_id,
-                                    "input": payload.user_input,
-                                    "used": ["hinglish_model"],
-                                    "result": "rejected: hinglish_model",
-                                    "detected_language": label,
-                                    "supported_languages": supported_languages
-                                }
-                            }
-            else:
-                debug_info["used"].append("hinglish_model_failed")
-  # ✅ Step 1: Greeting/Keyword Detection (now runs only for 2–3 word inputs)
-    detected_greeting_lang = detect_any_greeting_language(payload.user_input, supported_languages)
-    if detected_greeting_lang:
-        debug_info["used"].append("keyword_match")
-        debug_info["detected_language"] = detected_greeting_lang
-
-        if detected_greeting_lang in supported_languages:
-            debug_info["result"] = "accepted: keyword in supported"
-            return {"supported": True, "debug_info": debug_info}
-        else:
-            debug_info["result"] = "rejected: keyword in unsupported"
-            return {
-                "supported": False,
-                "message": BOT_PERSONALITY_MAP[payload.bot_id],
-                "debug_info": debug_info
-            }
-
-    # Step 2: Final Fallback → Lingua detector
-    debug_info["used"].append("final_lingua_fallback")
-    detected_language_enum = DETECTOR.detect_language_of(payload.user_input)
-    if detected_language_enum:
-        detected_lang = detected_language_enum.name.lower()
-        debug_info["detected_language"] = detected_lang
-        if detected_lang in supported_languages:
-            debug_info["result"] = "accepted: fallback lingua"
-            return {"supported": True, "debug_info": debug_info}
-        else:
-            debug_info["result"] = "rejected: fallback lingua"
-            return {"supported": False, "message": BOT_PERSONALITY_MAP[payload.bot_id], "debug_info": debug_info}
-
-    # Step 3: Nothing detected — allow fallback
-    debug_info["used"].append("final_fallback")
-    debug_info["result"] = "accepted: no detection, assumed safe"
-    return {"supported": True, "debug_info": debug_info}
+                if session.flipped(check.supported):
+                    verdict = check.to_dict(include_debug=False)
+                    verdict["length"] = len(session.text)
+                    await websocket.send_json(verdict)
+                continue
+
+            if message["type"] == "websocket.disconnect":
+                return
+            try:
+                # Binary frames are accepted as UTF-8 JSON; a bad encoding is a ValueError.
+                raw = message.get("text")
+                if raw is None:
+                    raw = (message.get("bytes") or b"").decode("utf-8")
+                pending = session.apply(json.loads(raw)) or pending
+            except (ValueError, TypeError) as e:
+                await websocket.send_json({"error": str(e)})
+    except WebSocketDisconnect:
+        pass
+
+
+# -----------------------------
+# --- Model Registry API ---
+# -----------------------------
+
+# Loading, routing and promoting models changes live traffic, so it is opt-in.
+MODEL_ADMIN_ENABLED = os.getenv("LANGUAGE_CHECK_MODEL_ADMIN", "0").lower() in ("1", "true", "yes")
+
+
+class CandidatePayload(BaseModel):
+    source: str
+    version: str | None = None
+    percent: float = 0.0
+    shadow: bool = False
+
 
+class RoutingPayload(BaseModel):
+    percent: float | None = None
+    shadow: bool | None = None
+
+
+def clear_cached_verdicts(registry: ModelRegistry) -> None:
+    RESULT_CACHE.clear()
+    STREAM_CACHE.clear()
+
+
+def invalidate_cached_verdicts(registry: ModelRegistry) -> None:
+    # Verdicts from the previous model version must not be served after a swap.
+    clear_cached_verdicts(registry)
+    if RESULT_STORE is not None:
+        RESULT_STORE.set_version(result_store_version())
+
+
+HINGLISH_MODELS.on_promote.append(invalidate_cached_verdicts)
+HINGLISH_MODELS.on_drop.append(clear_cached_verdicts)
+
+
+def get_model_registry(pack_name: str) -> ModelRegistry:
+    if pack_name not in LANGUAGE_PACKS or not LANGUAGE_PACKS[pack_name].has_model:
+        raise HTTPException(status_code=404, detail=f"No model registered for language pack '{pack_name}'.")
+    return LANGUAGE_PACKS[pack_name].models
+
+
+@app.get("/models")
+async def model_status():
+    return {pack.name: pack.models.status() for pack in LANGUAGE_PACKS if pack.has_model}
+
+
+@app.get("/models/metrics", response_class=PlainTextResponse)
+async def model_metrics():
+    """Per-version request, failure, latency and shadow-agreement metrics in Prometheus text format."""
+    lines = [line for pack in LANGUAGE_PACKS if pack.has_model for line in pack.models.prometheus()]
+    return PlainTextResponse("\n".join(lines) + "\n")
+
+
+if MODEL_ADMIN_ENABLED:
+    @app.post("/models/{pack_name}/candidate", status_code=202)
+    async def load_candidate(pack_name: str, payload: CandidatePayload):
+        """Loads a candidate version in the background; it serves percent% of traffic, or shadows, once loaded."""
+        registry = get_model_registry(pack_name)
+        try:
+            registry.load_candidate(payload.source, payload.version, payload.percent, payload.shadow)
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return registry.status()
+
+    @app.patch("/models/{pack_name}/candidate")
+    async def route_candidate(pack_name: str, payload: RoutingPayload):
+        registry = get_model_registry(pack_name)
+        registry.configure(payload.percent, payload.shadow)
+        return registry.status()
+
+    @app.post("/models/{pack_name}/promote")
+    async def promote_candidate(pack_name: str):
+        registry = get_model_registry(pack_name)
+        try:
+            registry.promote()
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return registry.status()
+
+    @app.delete("/models/{pack_name}/candidate")
+    async def drop_candidate(pack_name: str):
+        registry = get_model_registry(pack_name)
+        registry.drop_candidate()
+        return registry.status()
+
+
+@app.on_event("startup")
+async def load_language_packs():
+    # Models load here rather than at import; the server starts accepting requests once they are ready.
+    await asyncio.to_thread(load_bot_language_packs)
+
+
+@app.on_event("shutdown")
+def flush_result_store():
+    if RESULT_STORE is not None:
+        RESULT_STORE.close()
+
+
+@app.on_event("shutdown")
+def stop_stream_workers():
+    STREAM_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
+
+# -----------------------------
+# --- Profiling API ---
+# -----------------------------
+if PROFILER_ENABLED:
+    @app.get("/debug/profile", response_class=PlainTextResponse)
+    async def profile(seconds: float = 10.0):
+        """Samples live traffic for N seconds (max 60) and returns collapsed stacks for a flamegraph."""
+        seconds = min(max(seconds, 0.1), 60.0)
+        try:
+            folded = await asyncio.to_thread(sample_stacks, seconds)
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return PlainTextResponse(folded)
@@ -0,0 +1,265 @@
+"""
+Versioned registry for a language pack's specialized model.
+
+Holds the active model version plus an optional candidate loaded in the background.
+The candidate can take a percentage of traffic (A/B) or run in shadow mode, where
+it sees the same inputs as the active model off the request path and only its
+agreement is recorded. Promoting swaps one attribute, so in-flight requests finish
+on the version they started with and no request is dropped. While a candidate is
+experimenting, callers should bypass their verdict caches so every input reaches
+route() and shadow_compare().
+"""
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+LATENCY_WINDOW = 2048
+MAX_SHADOW_BACKLOG = 64
+
+
+def _label_value(value: str) -> str:
+    """Escapes a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class ModelVersion:
+    """One loaded model plus its rolling latency window and outcome counters."""
+    __slots__ = ("version", "source", "model", "loaded_at", "requests", "failures", "latencies", "_lock")
+
+    def __init__(self, version: str, source: str, model):
+        self.version = version
+        self.source = source
+        self.model = model
+        self.loaded_at = time.time()
+        self.requests = 0
+        self.failures = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            self.failures += not ok
+            self.latencies.append(seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self.latencies)
+            requests, failures = self.requests, self.failures
+
+        def pct(p: float) -> float:
+            return 1000 * latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] if latencies else 0.0
+
+        return {
+            "version": self.version,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "requests": requests,
+            "failures": failures,
+            "latency_ms": {
+                "mean": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+                "p50": pct(50),
+                "p95": pct(95),
+                "p99": pct(99),
+            },
+        }
+
+
+class ModelRegistry:
+    """Active/candidate versions of one model, with routing, shadowing and metrics."""
+
+    def __init__(self, name: str, loader: Callable[[str], object], source: str, version: str | None = None):
+        self.name = name
+        self.loader = loader
+        self.initial_source = source
+        self.initial_version = version or source
+        self.active = None
+        self.candidate = None
+        self.candidate_percent = 0.0
+        self.shadow = False
+        self.loading = None
+        self.load_error = None
+        self.active_error = None
+        self.compared = 0
+        self.agreed = 0
+        self.shadow_dropped = 0
+        self.shadow_unpaired = 0
+        self.on_promote = []
+        self.on_drop = []
+        self._loaded_initial = False
+        self._lock = threading.Lock()
+        self._shadow_pool = None
+        self._shadow_backlog = 0
+
+    @property
+    def current_version(self) -> str:
+        return self.active.version if self.active is not None else self.initial_version
+
+    @property
+    def experimenting(self) -> bool:
+        """True while a candidate takes a share of traffic or runs in shadow mode."""
+        return self.candidate is not None and (self.shadow or self.candidate_percent > 0)
+
+    # --- Loading & swapping ---
+
+    def _load(self, source: str, version: str) -> ModelVersion | None:
+        model = self.loader(source)
+        return ModelVersion(version, source, model) if model is not None else None
+
+    def ensure_loaded(self) -> ModelVersion | None:
+        """Loads the initial version on first use; None if it failed to load."""
+        if not self._loaded_initial:
+            with self._lock:
+                if not self._loaded_initial:
+                    self.active = self._load(self.initial_source, self.initial_version)
+                    if self.active is None:
+                        self.active_error = f"loader returned no model for {self.initial_source!r}"
+                    self._loaded_initial = True
+        return self.active
+
+    def load_candidate(self, source: str, version: str | None = None, percent: float = 0.0, shadow: bool = False) -> None:
+        """Starts loading a candidate in a background thread; it starts serving once loaded."""
+        version = version or source
+        with self._lock:
+            if self.loading is not None:
+                raise RuntimeError(f"{self.name}: version {self.loading!r} is still loading")
+            self.loading = version
+            self.load_error = None
+
+        def run():
+            try:
+                candidate = self._load(source, version)
+                if candidate is None:
+                    raise RuntimeError(f"loader returned no model for {source!r}")
+                with self._lock:
+                    self.compared = self.agreed = self.shadow_dropped = self.shadow_unpaired = 0
+                    self.candidate_percent = min(max(percent, 0.0), 100.0)
+                    self.shadow = shadow
+                    self.candidate = candidate
+                print(f"{self.name}: candidate '{version}' loaded ({self.candidate_percent}% traffic, shadow={shadow}).")
+            except Exception as e:
+                self.load_error = str(e)
+                print(f"CRITICAL: {self.name}: failed to load candidate '{version}'. Error: {e}")
+            finally:
+                self.loading = None
+
+        threading.Thread(target=run, name=f"{self.name}-loader", daemon=True).start()
+
+    def configure(self, percent: float | None = None, shadow: bool | None = None) -> None:
+        if percent is not None:
+            self.candidate_percent = min(max(percent, 0.0), 100.0)
+        if shadow is not None:
+            self.shadow = shadow
+
+    def promote(self) -> ModelVersion:
+        """Makes the candidate the active version."""
+        with self._lock:
+            if self.candidate is None:
+                raise RuntimeError(f"{self.name}: no candidate to promote")
+            self.active, self.candidate = self.candidate, None
+            self.candidate_percent, self.shadow = 0.0, False
+        for callback in self.on_promote:
+            callback(self)
+        print(f"{self.name}: promoted '{self.active.version}'.")
+        return self.active
+
+    def drop_candidate(self) -> None:
+        with self._lock:
+            dropped, self.candidate = self.candidate, None
+            self.candidate_percent, self.shadow = 0.0, False
+        if dropped is not None:
+            for callback in self.on_drop:
+                callback(self)
+            print(f"{self.name}: dropped candidate '{dropped.version}'.")
+
+    # --- Request path ---
+
+    def route(self, text: str) -> ModelVersion | None:
+        """
+        Version that serves this input. The split hashes the text, so a given input
+        always lands on the same version.
+        """
+        active = self.ensure_loaded()
+        candidate = self.candidate
+        if candidate is not None and not self.shadow and self.candidate_percent > 0:
+            if zlib.crc32(text.encode("utf-8")) % 10_000 < self.candidate_percent * 100:
+                return candidate
+        return active
+
+    def shadow_compare(self, text: str, label: str | None, predict: Callable[[ModelVersion, str], str | None]) -> None:
+        """
+        Queues the candidate on the same input, off the request path, and records agreement.
+        With no active model (it failed to load) the candidate still runs, so its latency
+        and failures are measured, but there is nothing to agree with: it counts as unpaired.
+        """
+        paired = self.active is not None
+        candidate = self.candidate
+        if candidate is None or not self.shadow:
+            return
+        with self._lock:
+            if self._shadow_backlog >= MAX_SHADOW_BACKLOG:
+                self.shadow_dropped += 1
+                return
+            self._shadow_backlog += 1
+            if self._shadow_pool is None:
+                self._shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{self.name}-shadow")
+
+        def run():
+            try:
+                shadow_label = predict(candidate, text)
+                with self._lock:
+                    if paired:
+                        self.compared += 1
+                        self.agreed += shadow_label == label
+                    else:
+                        self.shadow_unpaired += 1
+            finally:
+                with self._lock:
+                    self._shadow_backlog -= 1
+
+        self._shadow_pool.submit(run)
+
+    # --- Metrics ---
+
+    def status(self) -> dict:
+        active, candidate = self.active, self.candidate
+        return {
+            "name": self.name,
+            "active": active.stats() if active else None,
+            "candidate": candidate.stats() if candidate else None,
+            "candidate_percent": self.candidate_percent,
+            "shadow": self.shadow,
+            "cache_bypassed": self.experimenting,
+            "loading": self.loading,
+            "load_error": self.load_error,
+            "active_error": self.active_error,
+            "shadow_compared": self.compared,
+            "shadow_agreement": self.agreed / self.compared if self.compared else None,
+            "shadow_dropped": self.shadow_dropped,
+            "shadow_unpaired": self.shadow_unpaired,
+        }
+
+    def prometheus(self) -> list[str]:
+        """Metrics in Prometheus text exposition format, one line per sample."""
+        lines = []
+        for role, model in (("active", self.active), ("candidate", self.candidate)):
+            if model is None:
+                continue
+            stats = model.stats()
+            labels = f'model="{_label_value(self.name)}",version="{_label_value(model.version)}",role="{role}"'
+            lines.append(f"language_check_model_requests_total{{{labels}}} {stats['requests']}")
+            lines.append(f"language_check_model_failures_total{{{labels}}} {stats['failures']}")
+            for quantile in ("p50", "p95", "p99"):
+                q = int(quantile[1:]) / 100
+                lines.append(
+                    f'language_check_model_latency_ms{{{labels},quantile="{q}"}} {stats["latency_ms"][quantile]:.3f}'
+                )
+        name = _label_value(self.name)
+        lines.append(f'language_check_model_candidate_percent{{model="{name}"}} {self.candidate_percent}')
+        lines.append(f'language_check_model_shadow_compared_total{{model="{name}"}} {self.compared}')
+        lines.append(f'language_check_model_shadow_agreed_total{{model="{name}"}} {self.agreed}')
+        lines.append(f'language_check_model_shadow_unpaired_total{{model="{name}"}} {self.shadow_unpaired}')
+        return lines
@@ -0,0 +1,130 @@
+"""
+Hashed character-trigram pre-filter for Latin-script input.
+
+A multinomial naive Bayes model over hashed trigrams, i.e. a linear classifier
+whose weights live in a single (languages x buckets) NumPy array. It gives a
+verdict only when it is clearly confident and returns None otherwise, so the
+caller can fall through to lingua.
+"""
+import re
+import zlib
+
+import numpy as np
+
+# Seed text on top of KEYWORD_MAP: high-frequency function words per language.
+FUNCTION_WORDS = {
+    "english": [
+        "the", "and", "you", "that", "was", "for", "are", "with", "his", "they",
+        "this", "have", "from", "one", "had", "word", "but", "not", "what", "all",
+        "were", "when", "your", "can", "said", "there", "use", "each", "which", "she",
+        "how", "their", "will", "other", "about", "out", "many", "then", "them", "these",
+        "would", "like", "into", "time", "has", "look", "more", "write", "could", "people",
+        "than", "first", "been", "who", "its", "now", "find", "where", "after", "should",
+        "going", "doing", "thing", "think", "know", "want", "just", "really", "because", "today",
+    ],
+    "french": [
+        "le", "la", "les", "des", "une", "est", "pas", "que", "qui", "dans",
+        "pour", "sur", "avec", "mais", "nous", "vous", "ils", "elle", "elles", "sont",
+        "cette", "ces", "leur", "aussi", "comme", "tout", "fait", "être", "avoir", "très",
+        "peut", "bien", "où", "quand", "même", "alors", "donc", "parce", "quoi", "moi",
+        "toi", "notre", "votre", "aujourd'hui", "demain", "je", "suis", "ne", "du", "au",
+        "aux", "chez", "veux", "voudrais", "faire", "avec", "rien", "jamais", "toujours", "beaucoup",
+        "ça", "été", "déjà", "après", "français", "voilà", "peut-être", "c'est", "j'ai", "qu'il",
+    ],
+    "german": [
+        "der", "die", "das", "und", "ist", "nicht", "ein", "eine", "ich", "du",
+        "sie", "wir", "ihr", "mit", "auf", "für", "von", "zu", "den", "dem",
+        "des", "sich", "auch", "noch", "nur", "wie", "was", "wenn", "dass", "aber",
+        "oder", "kann", "habe", "haben", "sind", "wird", "werden", "mehr", "sehr", "schon",
+        "heute", "morgen", "möchte", "über", "können", "müssen", "zeit", "keine", "gibt", "weil",
+        "hier", "jetzt", "immer", "etwas", "nichts", "viel", "warum", "wieder", "ganz", "bitte",
+        "schön", "größe", "straße", "mädchen", "früh", "spät", "würde", "hätte", "wäre", "deutsch",
+    ],
+    "hindi": [
+        "main", "mera", "meri", "mujhe", "tum", "tumhara", "aap", "aapka", "hai", "hain",
+        "tha", "thi", "kya", "kyun", "kaise", "kab", "kahan", "nahi", "bahut", "accha",
+        "yaar", "bhai", "kar", "karo", "raha", "rahi", "gaya", "gayi", "abhi", "kal",
+        "aaj", "woh", "yeh", "hum", "humko", "tumko", "kuch", "sab", "jaana", "aana",
+    ],
+    "japanese": [
+        "watashi", "anata", "desu", "masu", "deshita", "nani", "nan", "doko", "itsu", "dare",
+        "kore", "sore", "are", "kono", "sono", "totemo", "chotto", "mainichi", "kyou", "ashita",
+        "kinou", "ikimasu", "tabemasu", "nomimasu", "suki", "kirai", "ii", "warui", "kawaii", "oishii",
+        "dakara", "demo", "soshite", "mada", "mou", "zenbu", "ne", "yo", "ka", "no",
+    ],
+}
+
+# Characters that settle French vs German on their own.
+DIACRITICS = {
+    "french": "éèêëàâçîïôûùœ",
+    "german": "äöüß",
+}
+DIACRITIC_WEIGHT = 4.0
+
+_WORD_RE = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+
+def _trigrams(text: str) -> list[str]:
+    grams = []
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f" {word} "
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def is_latin_script(text: str) -> bool:
+    """True when every letter in the text is Latin (ASCII or Latin-1/Extended-A)."""
+    return all(char < 'ɐ' for char in text if char.isalpha())
+
+
+class NgramPrefilter:
+    """Linear classifier over hashed character trigrams, weights held in a NumPy array."""
+
+    def __init__(self, languages: list[str], weights: np.ndarray, buckets: int):
+        self.languages = languages
+        self.weights = weights
+        self.buckets = buckets
+        self._diacritic_rows = [
+            (languages.index(lang), chars) for lang, chars in DIACRITICS.items() if lang in languages
+        ]
+
+    @classmethod
+    def from_samples(cls, samples: dict[str, list[str]], buckets: int = 4096, alpha: float = 0.5) -> "NgramPrefilter":
+        """Fits per-language smoothed trigram log-probabilities from seed phrases."""
+        languages = list(samples)
+        counts = np.zeros((len(languages), buckets), dtype=np.float32)
+        for row, lang in enumerate(languages):
+            indices = [zlib.crc32(g.encode("utf-8")) % buckets for phrase in samples[lang] for g in _trigrams(phrase)]
+            counts[row] = np.bincount(np.asarray(indices, dtype=np.int64), minlength=buckets)
+        counts += alpha
+        weights = np.log(counts / counts.sum(axis=1, keepdims=True)).astype(np.float32)
+        return cls(languages, weights, buckets)
+
+    def scores(self, text: str) -> tuple[np.ndarray, int]:
+        """Returns per-language log scores and the number of trigrams they were built from."""
+        grams = _trigrams(text)
+        if not grams:
+            return np.zeros(len(self.languages), dtype=np.float32), 0
+        indices = np.fromiter(
+            (zlib.crc32(g.encode("utf-8")) % self.buckets for g in grams), dtype=np.int64, count=len(grams)
+        )
+        scores = self.weights[:, indices].sum(axis=1)
+        lowered = text.lower()
+        for row, chars in self._diacritic_rows:
+            hits = sum(lowered.count(c) for c in chars)
+            if hits:
+                scores[row] += DIACRITIC_WEIGHT * hits
+        return scores, len(grams)
+
+    def predict(self, text: str, min_margin: float = 0.6, min_ngrams: int = 12) -> str | None:
+        """
+        Returns the language when the per-trigram score margin over the runner-up
+        is at least min_margin, otherwise None ("undecided").
+        """
+        scores, n = self.scores(text)
+        if n < min_ngrams:
+            return None
+        top, second = np.argsort(scores)[::-1][:2]
+        if (scores[top] - scores[second]) / n < min_margin:
+            return None
+        return self.languages[top]
@@ -0,0 +1,201 @@
+"""
+SQLite-backed store of cascade verdicts, used to pre-warm VerdictCache after a restart.
+
+Rows are tagged with a version string derived from everything that can change a
+verdict (model name, keyword sets, cascade config). Rows from other versions are
+dropped when the store is opened. The table is bounded: a background thread flushes
+buffered verdicts every flush_interval seconds and, every prune_interval seconds,
+deletes rows not hit within max_age and trims the table to the max_rows most hit.
+record() only touches an in-memory dict, so the request path never waits on SQLite.
+
+The database is one local file per instance and uses WAL mode, which SQLite does not
+support on network filesystems. On Cloud Run, point path at local disk (e.g. /tmp)
+and snapshot at a mounted volume: the snapshot is copied in when the store opens and
+written back atomically when it closes. Instances never share a live database, so a
+rolling deploy cannot have two versions deleting each other's rows; the last instance
+to shut down leaves its snapshot for the next one.
+"""
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS verdicts (
+        version    TEXT NOT NULL,
+        languages  TEXT NOT NULL,
+        input      TEXT NOT NULL,
+        verdict    TEXT NOT NULL,
+        hits       INTEGER NOT NULL DEFAULT 1,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (version, languages, input)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS verdicts_by_hits ON verdicts (hits, updated_at)",
+    "CREATE INDEX IF NOT EXISTS verdicts_by_age ON verdicts (updated_at)",
+)
+
+UPSERT = """
+INSERT INTO verdicts (version, languages, input, verdict, hits, updated_at)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (version, languages, input) DO UPDATE SET
+    verdict = excluded.verdict,
+    hits = hits + excluded.hits,
+    updated_at = excluded.updated_at
+"""
+
+
+class ResultStore:
+    """Buffers verdicts in memory; a background thread writes them to SQLite."""
+
+    def __init__(
+        self,
+        path: str,
+        version: str,
+        flush_every: int = 256,
+        max_rows: int = 100_000,
+        max_age: float = 30 * 86400,
+        flush_interval: float = 5.0,
+        prune_interval: float = 300.0,
+        snapshot: str | None = None,
+    ):
+        self.path = path
+        self.version = version
+        self.flush_every = flush_every
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self.prune_interval = prune_interval
+        self.snapshot = snapshot
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+
+        if snapshot and os.path.exists(snapshot) and not os.path.exists(path):
+            shutil.copyfile(snapshot, path)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+        stale = self._conn.execute("DELETE FROM verdicts WHERE version != ?", (version,)).rowcount
+        stale += self._prune()
+        self._conn.commit()
+        if stale:
+            print(f"Result store '{path}': dropped {stale} stale entries.")
+
+        self._writer = threading.Thread(target=self._run, name="result-store-writer", daemon=True)
+        self._writer.start()
+
+    def set_version(self, version: str) -> None:
+        """Flushes pending verdicts under the old version, then drops every row not matching the new one."""
+        self.flush()
+        with self._db_lock, self._conn:
+            self.version = version
+            self._conn.execute("DELETE FROM verdicts WHERE version != ?", (version,))
+
+    def load(self, limit: int) -> list[tuple]:
+        """Returns up to limit (key, verdict) pairs, most frequently hit first."""
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT languages, input, verdict FROM verdicts WHERE version = ? "
+                "ORDER BY hits DESC, updated_at DESC LIMIT ?",
+                (self.version, limit),
+            ).fetchall()
+        entries = []
+        for languages, user_input, verdict in rows:
+            supported, result, detected_language, used, has_languages = json.loads(verdict)
+            key = (tuple(languages.split(",")), user_input)
+            entries.append((key, (supported, result, detected_language, tuple(used), has_languages)))
+        return entries
+
+    def record(self, key: tuple, verdict: tuple | None = None) -> None:
+        """Queues a new verdict, or a hit on a known one when verdict is None."""
+        with self._pending_lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = [verdict, 1]
+            else:
+                pending[1] += 1
+                if verdict is not None:
+                    pending[0] = verdict
+            should_flush = len(self._pending) >= self.flush_every
+        if should_flush:
+            self._wake.set()
+
+    def _run(self) -> None:
+        next_prune = time.monotonic() + self.prune_interval
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if time.monotonic() >= next_prune:
+                    self.prune()
+                    next_prune = time.monotonic() + self.prune_interval
+            except sqlite3.Error as e:
+                print(f"CRITICAL: Result store '{self.path}': write failed. Error: {e}")
+
+    def flush(self) -> None:
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        now = time.time()
+        new_rows, hit_rows = [], []
+        for (languages, user_input), (verdict, hits) in pending.items():
+            if verdict is None:
+                hit_rows.append((hits, now, self.version, ",".join(languages), user_input))
+            else:
+                new_rows.append((self.version, ",".join(languages), user_input, json.dumps(verdict), hits, now))
+        with self._db_lock, self._conn:
+            self._conn.executemany(UPSERT, new_rows)
+            self._conn.executemany(
+                "UPDATE verdicts SET hits = hits + ?, updated_at = ? "
+                "WHERE version = ? AND languages = ? AND input = ?",
+                hit_rows,
+            )
+
+    def prune(self) -> int:
+        """Applies max_age and max_rows; returns how many rows were deleted."""
+        with self._db_lock, self._conn:
+            return self._prune()
+
+    def _prune(self) -> int:
+        deleted = self._conn.execute(
+            "DELETE FROM verdicts WHERE updated_at < ?", (time.time() - self.max_age,)
+        ).rowcount
+        excess = self._conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0] - self.max_rows
+        if excess > 0:
+            deleted += self._conn.execute(
+                "DELETE FROM verdicts WHERE rowid IN "
+                "(SELECT rowid FROM verdicts ORDER BY hits ASC, updated_at ASC LIMIT ?)",
+                (excess,),
+            ).rowcount
+        return deleted
+
+    def close(self) -> None:
+        self._closed.set()
+        self._wake.set()
+        self._writer.join()
+        self.flush()
+        self.prune()
+        if self.snapshot:
+            self._write_snapshot()
+        self._conn.close()
+
+    def _write_snapshot(self) -> None:
+        # Write a complete copy next to the snapshot, then rename over it, so a reader
+        # never sees a half-written file.
+        partial = f"{self.snapshot}.{os.getpid()}.partial"
+        target = sqlite3.connect(partial)
+        try:
+            with self._db_lock:
+                self._conn.backup(target)
+        finally:
+            target.close()
+        os.replace(partial, self.snapshot)
@@ -0,0 +1,58 @@
+"""
+Per-connection state for the /ws/language_check streaming endpoint.
+
+The client sends edits as the user types:
+
+    {"text": "full current input"}   replace
+    {"append": "abc"}                 characters typed at the end
+    {"backspace": 2}                  characters deleted from the end
+
+and the server pushes {"supported": ..., "message": ..., "length": ...} only when
+the verdict for the current input differs from the last one it sent.
+"""
+from language_packs import TextAnalysis
+
+MAX_STREAM_CHARS = 2000
+
+
+class StreamSession:
+    """Current text of one conversation plus the analysis and verdict last computed for it."""
+    __slots__ = ("bot_id", "analysis", "last_supported")
+
+    def __init__(self, bot_id: str):
+        self.bot_id = bot_id
+        self.analysis = TextAnalysis("")
+        self.last_supported = None
+
+    @property
+    def text(self) -> str:
+        return self.analysis.text
+
+    def apply(self, update: dict) -> bool:
+        """Applies one edit; returns True if the text changed. Raises ValueError on a malformed edit."""
+        if "text" in update:
+            text = update["text"]
+        elif "append" in update:
+            text = self.text + update["append"]
+        elif "backspace" in update:
+            count = update["backspace"]
+            if not isinstance(count, int) or count < 0:
+                raise ValueError("backspace must be a non-negative integer")
+            text = self.text[:len(self.text) - count] if count else self.text
+        else:
+            raise ValueError("expected one of 'text', 'append' or 'backspace'")
+
+        if not isinstance(text, str):
+            raise ValueError("text must be a string")
+        text = text[:MAX_STREAM_CHARS]
+        if text == self.text:
+            return False
+        self.analysis = self.analysis.extend(text)
+        return True
+
+    def flipped(self, supported: bool) -> bool:
+        """Records a verdict; True if it should be pushed to the client."""
+        if supported == self.last_supported:
+            return False
+        self.last_supported = supported
+        return True
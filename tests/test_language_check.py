@@ -0,0 +1,102 @@
+import pytest
+from lingua import Language
+
+import main
+from language_packs import LanguagePack, PackRegistry
+from main import CheckConfig, VerdictCache, run_language_check
+from model_registry import ModelVersion
+from result_store import ResultStore
+
+DELHI_BOT = "delhi_friend_male"
+HINGLISH = "kya haal hai bhai, sab theek"
+
+
+class FakePipeline:
+    """Stands in for the transformers pipeline; always predicts one label."""
+
+    def __init__(self, label: str):
+        self.label = label
+
+    def preprocess(self, text):
+        return text
+
+    def forward(self, inputs):
+        return inputs
+
+    def postprocess(self, outputs):
+        return [{"label": self.label, "score": 0.99}]
+
+
+@pytest.fixture
+def hinglish_models(monkeypatch):
+    registry = main.HINGLISH_MODELS
+    monkeypatch.setattr(registry, "_loaded_initial", True)
+    monkeypatch.setattr(registry, "active", ModelVersion("active", "active", FakePipeline("hin")))
+    monkeypatch.setattr(registry, "candidate", None)
+    monkeypatch.setattr(registry, "candidate_percent", 0.0)
+    monkeypatch.setattr(registry, "shadow", False)
+    return registry
+
+
+def test_warm_round_trips_verdict_through_store(tmp_path):
+    key = (("french", "english"), "Bonjour, comment ça va ?")
+    verdict = (False, "rejected: fallback lingua", "german", ("ngram_prefilter", "final_lingua_fallback"), True)
+
+    store = ResultStore(str(tmp_path / "verdicts.db"), "v1")
+    VerdictCache(8, store=store).put(key, verdict)
+    store.close()
+
+    store = ResultStore(str(tmp_path / "verdicts.db"), "v1")
+    try:
+        cache = VerdictCache(8, store=store)
+        assert cache.warm() == 1
+        assert cache.get(key) == verdict
+    finally:
+        store.close()
+
+
+def test_active_model_verdicts_are_cached(hinglish_models):
+    cache = VerdictCache(8)
+    first = run_language_check(DELHI_BOT, HINGLISH, cache=cache)
+    assert first.cacheable and first.result == "accepted"
+    assert run_language_check(DELHI_BOT, HINGLISH, cache=cache).used[-1] == "cache_hit"
+    assert hinglish_models.active.requests == 1
+
+
+def test_cache_is_bypassed_while_experimenting(hinglish_models, monkeypatch):
+    cache = VerdictCache(8)
+    run_language_check(DELHI_BOT, HINGLISH, cache=cache)
+    monkeypatch.setattr(hinglish_models, "candidate", ModelVersion("candidate", "candidate", FakePipeline("hin")))
+    monkeypatch.setattr(hinglish_models, "shadow", True)
+    assert hinglish_models.status()["cache_bypassed"]
+
+    for _ in range(3):
+        assert "cache_hit" not in run_language_check(DELHI_BOT, HINGLISH, cache=cache).used
+    assert hinglish_models.active.requests == 4
+
+
+def test_candidate_verdicts_are_not_cacheable(hinglish_models, monkeypatch):
+    monkeypatch.setattr(hinglish_models, "candidate", ModelVersion("candidate", "candidate", FakePipeline("eng")))
+    monkeypatch.setattr(hinglish_models, "candidate_percent", 100.0)
+    cache = VerdictCache(8)
+    check = run_language_check(DELHI_BOT, HINGLISH, cache=cache)
+    assert check.detected_language == "eng"
+    assert not check.cacheable
+    assert len(cache) == 0
+    assert hinglish_models.candidate.requests == 1
+
+
+def test_lingua_verdict_accepts_pack_named_differently_from_its_enum(monkeypatch):
+    registry = PackRegistry(main.ALL_SUPPORTED_LANGUAGES)
+    for name, language in (("english", Language.ENGLISH), ("brazilian_portuguese", Language.PORTUGUESE)):
+        registry.register(LanguagePack(name, language, []))
+    monkeypatch.setattr(main, "LANGUAGE_PACKS", registry)
+    monkeypatch.setitem(main.BOT_LANGUAGE_MAP, "rio_friend", ["brazilian_portuguese", "english"])
+    monkeypatch.setitem(main.BOT_PERSONALITY_MAP, "rio_friend", "Só português ou inglês!")
+
+    check = run_language_check(
+        "rio_friend", "Eu vou ao mercado mais tarde com a minha mãe e o meu irmão",
+        CheckConfig(stages=("lingua",)), None,
+    )
+    assert check.detected_language == "brazilian_portuguese"
+    assert check.supported
@@ -0,0 +1,96 @@
+import random
+
+from lingua import Language
+
+from language_packs import LanguagePack, PackRegistry, TextAnalysis, normalize_and_tokenize
+
+HINDI = LanguagePack("hindi", Language.HINDI, [], "devanagari", (("ऀ", "ॿ"),))
+JAPANESE = LanguagePack("japanese", Language.JAPANESE, [], "kana", (("぀", "ヿ"),))
+
+# Word characters, separators, a character whose lowercase is longer ("İ") and two scripts.
+ALPHABET = "ab cdé,.Ü İ नमस्ते  x かな"
+
+
+def _edit(rng: random.Random, text: str) -> str:
+    kind = rng.random()
+    if kind < 0.5:
+        return text + "".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 4)))
+    if kind < 0.8:
+        return text[:max(0, len(text) - rng.randint(1, 4))]
+    # Replace a random suffix, as when the user edits mid-sentence.
+    cut = rng.randint(0, len(text))
+    return text[:cut] + "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 6)))
+
+
+def test_extend_matches_fresh_analysis():
+    rng = random.Random(1234)
+    for _ in range(2_000):
+        analysis = TextAnalysis("")
+        for _ in range(10):
+            # Populate the memos the way the cascade would, sometimes only partially.
+            if rng.random() < 0.7:
+                analysis.tokens
+            if rng.random() < 0.7:
+                analysis.in_script(HINDI)
+            if rng.random() < 0.3:
+                analysis.in_script(JAPANESE)
+
+            analysis = analysis.extend(_edit(rng, analysis.text))
+            fresh = TextAnalysis(analysis.text)
+            assert analysis.tokens == fresh.tokens, analysis.text
+            assert analysis.in_script(HINDI) == fresh.in_script(HINDI), analysis.text
+            assert analysis.in_script(JAPANESE) == fresh.in_script(JAPANESE), analysis.text
+
+
+def test_extend_keeps_script_seen_in_unchanged_prefix():
+    analysis = TextAnalysis("नमस्ते")
+    assert analysis.in_script(HINDI)
+    extended = analysis.extend("नमस्ते dost")
+    assert extended._scripts["hindi"] == (HINDI, True)
+    assert not extended.extend("dost").in_script(HINDI)
+
+
+def _registry(keyword_lists: dict[str, list[str]]) -> PackRegistry:
+    registry = PackRegistry([])
+    for name, keywords in keyword_lists.items():
+        registry.register(LanguagePack(name, Language.ENGLISH, keywords))
+    return registry
+
+
+def _linear_scan(keyword_lists: dict[str, list[str]], tokens: list[str], bot_languages: list[str]) -> str | None:
+    # The scan detect_any_greeting_language did before the keyword index.
+    for lang in bot_languages:
+        if any(word in tokens for word in keyword_lists.get(lang, [])):
+            return lang
+    for lang, keywords in keyword_lists.items():
+        if any(word in tokens for word in keywords):
+            return lang
+    return None
+
+
+def test_match_keyword_matches_linear_scan():
+    rng = random.Random(42)
+    # A small vocabulary shared across packs, so tokens often match several languages,
+    # plus multi-word and punctuated keywords, which can never equal a single token.
+    vocabulary = [f"w{i}" for i in range(40)] + ["how are you", "what's", "ça"]
+    names = [f"lang{i}" for i in range(8)]
+    keyword_lists = {name: rng.sample(vocabulary, rng.randint(0, 12)) for name in names}
+    registry = _registry(keyword_lists)
+
+    for _ in range(20_000):
+        tokens = normalize_and_tokenize(" ".join(rng.choices(vocabulary + ["other"], k=rng.randint(0, 5))))
+        bot_languages = rng.sample(names + ["unregistered"], rng.randint(0, 3))
+        expected = _linear_scan(keyword_lists, tokens, bot_languages)
+        assert registry.match_keyword(tokens, bot_languages) == expected, (tokens, bot_languages)
+
+
+def test_name_for_maps_lingua_results_to_pack_names():
+    registry = _registry({})
+    registry.register(LanguagePack("hindi", Language.HINDI, []))
+    registry.register(LanguagePack("hinglish", Language.HINDI, []))
+    registry.register(LanguagePack("brazilian_portuguese", Language.PORTUGUESE, []))
+
+    assert registry.name_for(Language.PORTUGUESE) == "brazilian_portuguese"
+    assert registry.name_for(Language.HINDI) == "hindi"
+    assert registry.name_for(Language.HINDI, ["hinglish", "english"]) == "hinglish"
+    assert registry.name_for(Language.SPANISH, ["hinglish"]) == "spanish"
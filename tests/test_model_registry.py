@@ -0,0 +1,103 @@
+import threading
+import time
+
+from model_registry import MAX_SHADOW_BACKLOG, ModelRegistry
+
+
+def _loader(source):
+    return None if source == "broken" else f"model:{source}"
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def _with_candidate(percent=0.0, shadow=False, active="v1"):
+    registry = ModelRegistry("test", _loader, active)
+    registry.ensure_loaded()
+    registry.load_candidate("v2", percent=percent, shadow=shadow)
+    _wait_for(lambda: registry.loading is None)
+    return registry
+
+
+def _drain(registry):
+    _wait_for(lambda: registry._shadow_backlog == 0)
+
+
+def test_route_splits_by_percent_and_is_stable():
+    registry = _with_candidate(percent=30)
+    texts = [f"message number {i}" for i in range(4000)]
+    served = [registry.route(text) for text in texts]
+    share = sum(version is registry.candidate for version in served) / len(texts)
+    assert 0.27 < share < 0.33
+    assert all(registry.route(text) is version for text, version in zip(texts, served))
+    assert registry.experimenting
+
+
+def test_route_ignores_shadow_and_zero_percent_candidates():
+    assert ModelRegistry("test", _loader, "v1").route("hello").version == "v1"
+    for registry in (_with_candidate(percent=0), _with_candidate(percent=50, shadow=True)):
+        assert all(registry.route(f"text {i}") is registry.active for i in range(200))
+    assert not _with_candidate(percent=0).experimenting
+
+
+def test_shadow_compare_counts_agreement():
+    registry = _with_candidate(shadow=True)
+    for i in range(10):
+        registry.shadow_compare(f"text {i}", "hin", lambda candidate, text: "hin" if text < "text 6" else "eng")
+    _drain(registry)
+    assert (registry.compared, registry.agreed) == (10, 6)
+    assert registry.status()["shadow_agreement"] == 0.6
+
+
+def test_shadow_backlog_is_capped():
+    registry = _with_candidate(shadow=True)
+    release = threading.Event()
+
+    def slow(candidate, text):
+        release.wait()
+        return "hin"
+
+    for i in range(MAX_SHADOW_BACKLOG + 5):
+        registry.shadow_compare(f"text {i}", "hin", slow)
+    assert registry.shadow_dropped == 5
+    release.set()
+    _drain(registry)
+    assert registry.compared == MAX_SHADOW_BACKLOG
+
+
+def test_shadow_runs_without_an_active_model():
+    registry = _with_candidate(shadow=True, active="broken")
+    assert registry.route("text") is None
+    assert registry.status()["active_error"] == "loader returned no model for 'broken'"
+    registry.shadow_compare("text", None, lambda candidate, text: "hin")
+    _drain(registry)
+    assert registry.compared == 0
+    assert registry.status()["shadow_unpaired"] == 1
+
+
+def test_promote_and_drop_run_callbacks():
+    promoted, dropped = [], []
+    registry = _with_candidate(percent=10)
+    registry.on_promote.append(lambda r: promoted.append(r.active.version))
+    registry.on_drop.append(lambda r: dropped.append(r.name))
+
+    registry.promote()
+    assert promoted == ["v2"] and registry.candidate is None and not registry.experimenting
+    registry.drop_candidate()  # nothing to drop
+    assert dropped == []
+
+    registry.load_candidate("v3", shadow=True)
+    _wait_for(lambda: registry.loading is None)
+    registry.drop_candidate()
+    assert dropped == ["test"] and registry.candidate is None
+
+
+def test_prometheus_escapes_label_values():
+    registry = ModelRegistry("test", _loader, "C:\\models\\hing \"v2\"")
+    registry.ensure_loaded()
+    line = registry.prometheus()[0]
+    assert 'version="C:\\\\models\\\\hing \\"v2\\""' in line
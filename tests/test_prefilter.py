@@ -0,0 +1,40 @@
+import unicodedata
+
+import pytest
+
+from main import PREFILTER
+
+
+def _strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+@pytest.mark.parametrize("text, language", [
+    ("Hélène préfère le thé glacé", "french"),
+    ("Müller fährt über München", "german"),
+])
+def test_diacritics_settle_french_vs_german(text, language):
+    assert PREFILTER.predict(text) == language
+    # The same letters without their accents are too close to call.
+    assert PREFILTER.predict(_strip_accents(text)) is None
+
+
+@pytest.mark.parametrize("text", [
+    "¿Dónde está la estación de trenes más cercana?",
+    "Me quedé dormido en el sofá viendo un documental",
+    "Prefiero caminar que coger el autobús lleno de gente",
+    "Mi sono addormentato sul divano guardando un documentario",
+    "Dove si trova la stazione più vicina?",
+    "Preferisco camminare piuttosto che prendere l'autobus",
+])
+def test_spanish_and_italian_stay_undecided(text):
+    assert PREFILTER.predict(text) is None
+
+
+def test_short_input_is_undecided():
+    text = "Très bien"
+    assert PREFILTER.scores(text)[1] < 12
+    # Even with no margin required, too few trigrams means no verdict.
+    assert PREFILTER.predict(text, min_margin=0.0, min_ngrams=12) is None
+    assert PREFILTER.predict(text, min_margin=0.0, min_ngrams=0) == "french"
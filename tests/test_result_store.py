@@ -0,0 +1,117 @@
+import time
+
+import pytest
+
+from result_store import ResultStore
+
+KEY = (("french", "english"), "Bonjour, comment ça va ?")
+VERDICT = (True, "accepted: ngram prefilter", "french", ("ngram_prefilter",), True)
+
+
+@pytest.fixture
+def open_store(tmp_path):
+    stores = []
+
+    def open_store(version="v1", **kwargs):
+        # Long intervals keep the writer thread idle; tests flush and prune explicitly.
+        kwargs.setdefault("flush_interval", 3600)
+        kwargs.setdefault("prune_interval", 3600)
+        store = ResultStore(str(tmp_path / "verdicts.db"), version, **kwargs)
+        stores.append(store)
+        return store
+
+    yield open_store
+    for store in stores:
+        if not store._closed.is_set():
+            store.close()
+
+
+def _rows(store):
+    return store._conn.execute("SELECT version, input, hits FROM verdicts ORDER BY input").fetchall()
+
+
+def test_record_does_not_write_until_flushed(open_store):
+    store = open_store()
+    store.record(KEY, VERDICT)
+    assert _rows(store) == []
+    store.flush()
+    assert _rows(store) == [("v1", KEY[1], 1)]
+
+
+def test_opening_another_version_drops_rows(open_store):
+    store = open_store("v1")
+    store.record(KEY, VERDICT)
+    store.close()
+
+    assert open_store("v1").load(10) == [(KEY, VERDICT)]
+    store = open_store("v2")
+    assert store.load(10) == []
+    assert _rows(store) == []
+
+
+def test_set_version_flushes_then_drops_old_rows(open_store):
+    store = open_store("v1")
+    store.record(KEY, VERDICT)
+    store.set_version("v2")
+    assert _rows(store) == []
+    store.record(KEY, VERDICT)
+    store.flush()
+    assert _rows(store) == [("v2", KEY[1], 1)]
+
+
+def test_load_returns_most_hit_first(open_store):
+    store = open_store()
+    for i, hits in enumerate([1, 5, 3]):
+        key = (("english",), f"input {i}")
+        store.record(key, VERDICT)
+        for _ in range(hits - 1):
+            store.record(key)
+    store.flush()
+    assert [key[1] for key, _ in store.load(10)] == ["input 1", "input 2", "input 0"]
+    assert [key[1] for key, _ in store.load(2)] == ["input 1", "input 2"]
+
+
+def test_hit_only_records_update_existing_rows(open_store):
+    store = open_store()
+    store.record(KEY, VERDICT)
+    store.flush()
+    store.record(KEY)
+    store.record((("english",), "never seen"))
+    store.flush()
+    assert _rows(store) == [("v1", KEY[1], 2)]
+
+
+def test_prune_drops_old_rows_then_least_hit(open_store):
+    store = open_store(max_rows=2, max_age=60)
+    for i in range(4):
+        key = (("english",), f"input {i}")
+        store.record(key, VERDICT)
+        for _ in range(i):
+            store.record(key)
+    store.flush()
+    store._conn.execute("UPDATE verdicts SET updated_at = ? WHERE input = 'input 3'", (time.time() - 120,))
+
+    assert store.prune() == 2  # "input 3" by age, then "input 0" as the least hit
+    assert [row[1] for row in _rows(store)] == ["input 1", "input 2"]
+
+
+def test_background_writer_flushes(open_store):
+    store = open_store(flush_every=1, flush_interval=0.05)
+    store.record(KEY, VERDICT)
+    deadline = time.time() + 5
+    while not _rows(store) and time.time() < deadline:
+        time.sleep(0.01)
+    assert _rows(store) == [("v1", KEY[1], 1)]
+
+
+def test_snapshot_round_trip(tmp_path):
+    snapshot = str(tmp_path / "snapshot.db")
+    first = ResultStore(str(tmp_path / "a.db"), "v1", snapshot=snapshot)
+    first.record(KEY, VERDICT)
+    first.close()
+
+    second = ResultStore(str(tmp_path / "b.db"), "v1", snapshot=snapshot)
+    try:
+        assert second.load(10) == [(KEY, VERDICT)]
+    finally:
+        second.close()
@@ -0,0 +1,70 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from streaming import MAX_STREAM_CHARS, StreamSession
+
+ENGLISH = "I am going to the market later today"
+FRENCH = "Je voudrais réserver une table pour deux personnes ce soir"
+
+
+def test_apply_edits():
+    session = StreamSession("berlin_friend_male")
+    assert session.apply({"text": "hallo"})
+    assert session.apply({"append": " du"})
+    assert session.text == "hallo du"
+    assert session.apply({"backspace": 3})
+    assert session.text == "hallo"
+    assert not session.apply({"backspace": 0})
+    assert not session.apply({"text": "hallo"})
+    session.apply({"text": "x" * (MAX_STREAM_CHARS + 10)})
+    assert len(session.text) == MAX_STREAM_CHARS
+
+
+@pytest.mark.parametrize("update", [{}, {"backspace": -1}, {"backspace": "2"}, {"text": 5}, {"append": None}])
+def test_apply_rejects_malformed_edits(update):
+    with pytest.raises((ValueError, TypeError)):
+        StreamSession("berlin_friend_male").apply(update)
+
+
+def test_flipped_only_on_change():
+    session = StreamSession("berlin_friend_male")
+    assert session.flipped(True)
+    assert not session.flipped(True)
+    assert session.flipped(False)
+
+
+def test_stream_pushes_first_verdict_then_only_flips():
+    client = TestClient(app)
+    with client.websocket_connect("/ws/language_check?bot_id=berlin_friend_male&debounce_ms=10") as ws:
+        ws.send_json({"text": ENGLISH})
+        assert ws.receive_json() == {"supported": True, "length": len(ENGLISH)}
+
+        # Still English: nothing is pushed, so the next message is the flip below.
+        ws.send_json({"append": " and tomorrow"})
+        ws.send_json({"text": FRENCH})
+        verdict = ws.receive_json()
+        assert verdict["supported"] is False
+        assert verdict["length"] == len(FRENCH)
+        assert "German or English" in verdict["message"]
+
+
+def test_stream_error_replies():
+    client = TestClient(app)
+    with client.websocket_connect("/ws/language_check?bot_id=berlin_friend_male&debounce_ms=10") as ws:
+        ws.send_text("not json")
+        assert "error" in ws.receive_json()
+        ws.send_json({"backspace": -1})
+        assert ws.receive_json() == {"error": "backspace must be a non-negative integer"}
+        ws.send_bytes(b"\xff\xfe")
+        assert "error" in ws.receive_json()
+
+        # Binary frames carrying UTF-8 JSON are accepted like text frames.
+        ws.send_bytes(f'{{"text": "{ENGLISH}"}}'.encode("utf-8"))
+        assert ws.receive_json() == {"supported": True, "length": len(ENGLISH)}
+
+
+def test_stream_rejects_unknown_bot():
+    client = TestClient(app)
+    with client.websocket_connect("/ws/language_check?bot_id=nobody") as ws:
+        assert ws.receive_json()["supported"] is False
@@ -0,0 +1,21 @@
+import tracing
+
+
+def test_untraced_calls_share_one_noop_context():
+    assert tracing.span("stage.lingua") is tracing.span("serialize", model="x")
+    with tracing.span("stage.lingua") as value:
+        assert value is None
+
+
+def test_request_trace_records_nested_spans(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", True)
+    with tracing.request_trace("language_check", bot_id="berlin_friend_male") as trace:
+        with tracing.span("stage.keyword"):
+            with tracing.span("lingua.detect"):
+                pass
+    root, outer, inner = trace.spans[2], trace.spans[1], trace.spans[0]
+    assert [root["name"], outer["name"], inner["name"]] == ["language_check", "stage.keyword", "lingua.detect"]
+    assert root["parent_span_id"] is None
+    assert outer["parent_span_id"] == root["span_id"]
+    assert inner["parent_span_id"] == outer["span_id"]
+    assert tracing.span("after") is tracing._NOT_TRACED
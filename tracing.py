@@ -0,0 +1,184 @@
+"""
+Request tracing, slow-request logging and an on-demand sampling profiler.
+
+Spans are only recorded while a request trace is active, which happens when
+at least one of these is configured:
+
+    LANGUAGE_CHECK_TRACE_EXPORT=file|otlp   export every span
+    LANGUAGE_CHECK_TRACE_FILE=traces.jsonl  target for the file exporter
+    LANGUAGE_CHECK_SLOW_REQUEST_MS=250      log the stage breakdown of slow requests
+
+The otlp exporter needs opentelemetry-sdk and opentelemetry-exporter-otlp and
+uses the standard OTEL_EXPORTER_OTLP_* variables to find the collector.
+"""
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+TRACE_EXPORT = os.getenv("LANGUAGE_CHECK_TRACE_EXPORT", "").lower()
+TRACE_FILE = os.getenv("LANGUAGE_CHECK_TRACE_FILE", "traces.jsonl")
+SLOW_REQUEST_MS = float(os.getenv("LANGUAGE_CHECK_SLOW_REQUEST_MS", "0"))
+PROFILER_ENABLED = os.getenv("LANGUAGE_CHECK_PROFILER", "0").lower() in ("1", "true", "yes")
+
+TRACING_ENABLED = bool(TRACE_EXPORT) or SLOW_REQUEST_MS > 0
+
+OTEL_TRACER = None
+if TRACE_EXPORT == "otlp":
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        _provider = TracerProvider(resource=Resource.create({"service.name": "language-check"}))
+        _provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        trace.set_tracer_provider(_provider)
+        OTEL_TRACER = trace.get_tracer("language_check")
+        print("OTLP trace export enabled.")
+    except Exception as e:
+        print(f"WARNING: OTLP trace export unavailable, falling back to {TRACE_FILE}. Error: {e}")
+        TRACE_EXPORT = "file"
+
+_current_trace = ContextVar("language_check_trace", default=None)
+_file_lock = threading.Lock()
+# Shared by every span() and request_trace() call while nothing is traced, so the
+# untraced path builds no generator. nullcontext is reusable and yields None.
+_NOT_TRACED = nullcontext()
+
+
+class RequestTrace:
+    __slots__ = ("trace_id", "name", "attributes", "start_ns", "spans", "_stack")
+
+    def __init__(self, name: str, attributes: dict):
+        self.trace_id = secrets.token_hex(16)
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.spans = []
+        self._stack = []
+
+    def breakdown(self) -> dict:
+        """Milliseconds spent per span name."""
+        totals = Counter()
+        for record in self.spans:
+            totals[record["name"]] += (record["end_time_unix_nano"] - record["start_time_unix_nano"]) / 1e6
+        return {name: round(ms, 3) for name, ms in totals.items()}
+
+
+def _new_span(trace: RequestTrace, name: str, attributes: dict) -> dict:
+    return {
+        "trace_id": trace.trace_id,
+        "span_id": secrets.token_hex(8),
+        "parent_span_id": trace._stack[-1]["span_id"] if trace._stack else None,
+        "name": name,
+        "start_time_unix_nano": time.time_ns(),
+        "end_time_unix_nano": None,
+        "attributes": attributes,
+    }
+
+
+def span(name: str, **attributes):
+    """Times a block as a child of the current request trace; a no-op outside one."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOT_TRACED
+    return _traced_span(trace, name, attributes)
+
+
+@contextmanager
+def _traced_span(trace: RequestTrace, name: str, attributes: dict):
+    record = _new_span(trace, name, attributes)
+    trace._stack.append(record)
+    try:
+        if OTEL_TRACER is not None:
+            with OTEL_TRACER.start_as_current_span(name, attributes=attributes):
+                yield
+        else:
+            yield
+    finally:
+        trace._stack.pop()
+        record["end_time_unix_nano"] = time.time_ns()
+        trace.spans.append(record)
+
+
+def _export(trace: RequestTrace, root: dict) -> None:
+    if TRACE_EXPORT == "file":
+        with _file_lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+            for record in trace.spans:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    duration_ms = (root["end_time_unix_nano"] - root["start_time_unix_nano"]) / 1e6
+    if SLOW_REQUEST_MS > 0 and duration_ms >= SLOW_REQUEST_MS:
+        # One JSON line on stdout, which Cloud Run picks up as a structured log entry.
+        print(json.dumps({
+            "severity": "WARNING",
+            "message": f"slow {trace.name}: {duration_ms:.1f} ms",
+            "trace_id": trace.trace_id,
+            "duration_ms": round(duration_ms, 3),
+            "attributes": trace.attributes,
+            "stages_ms": trace.breakdown(),
+        }, ensure_ascii=False))
+
+
+def request_trace(name: str, **attributes):
+    """Opens the root span for one request; exports it and checks the slow threshold on exit."""
+    if not TRACING_ENABLED:
+        return _NOT_TRACED
+    return _traced_request(name, attributes)
+
+
+@contextmanager
+def _traced_request(name: str, attributes: dict):
+    trace = RequestTrace(name, attributes)
+    token = _current_trace.set(trace)
+    try:
+        with span(name, **attributes):
+            yield trace
+    finally:
+        _current_trace.reset(token)
+        _export(trace, trace.spans[-1])
+
+
+# -----------------------------
+# --- Sampling Profiler ---
+# -----------------------------
+
+_profile_lock = threading.Lock()
+
+
+def _fold(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> str:
+    """
+    Samples every thread's Python stack for the given duration and returns them in
+    collapsed-stack format ("frame;frame;frame count" per line), ready for
+    flamegraph.pl or speedscope. Only one capture runs at a time.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("a profile capture is already running")
+    try:
+        own_thread = threading.get_ident()
+        stacks = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_thread:
+                    stacks[_fold(frame)] += 1
+            time.sleep(interval)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    finally:
+        _profile_lock.release()